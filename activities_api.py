@@ -0,0 +1,323 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import Flask, Response, request
+from app_settings import APP_CONFIG
+from deduplication import DuplicateIndex, load_duplicates_index
+from instrumentation import metrics, record_cache
+from records_index import RECORD_METRICS, RecordsIndex, load_records_index
+from summarize_activities import calculate_totals_by_sport, calculate_totals_by_year
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Respuestas cacheadas por versión de datos
+RESPONSE_CACHE_SIZE = 512
+# Tamaño mínimo (bytes) para comprimir con gzip
+GZIP_MIN_SIZE = 512
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+app = Flask(__name__)
+
+class DataVersion:
+    """
+    Instantánea de una versión del archivo de datos
+    Filas, récords y respuestas cacheadas viajan juntos, así que una petición
+    que empezó con una versión nunca mezcla datos ni respuestas de otra.
+    """
+
+    def __init__(self, version, rows=(), activities_by_id=None, records=None):
+        self.version = version
+        self.rows = rows
+        self.activities_by_id = activities_by_id or {}
+        self.records = records
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+
+    def cached(self, key, compute):
+        """Devuelve la respuesta cacheada para key o la calcula y la guarda"""
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                record_cache('api', True)
+                return self._responses[key]
+        record_cache('api', False)
+        value = compute()
+        with self._lock:
+            self._responses[key] = value
+            while len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        return value
+
+    def filter(self, years=None, months=None, types=None):
+        """Actividades que cumplen los filtros (None = sin filtro)"""
+        years = set(years or ())
+        months = set(months or ())
+        types = set(types or ())
+        return [
+            (date, activity) for year, month, date, activity_type, activity in self.rows
+            if (not years or year in years)
+            and (not months or month in months)
+            and (not types or activity_type in types)
+        ]
+
+class ActivityStore:
+    """
+    Actividades del archivo de datos
+    Se recarga solo cuando cambia la fecha de modificación del archivo o de
+    sus índices; cada
+    recarga publica una DataVersion nueva con su propia LRU de respuestas.
+    """
+
+    def __init__(self, filename=None, records_file=None, duplicates_file=None):
+        """
+        Args:
+            filename: Archivo de actividades (por defecto APP_CONFIG['data_file'])
+            records_file: Índice de récords guardado; si se indica un archivo de
+                actividades propio sin índice, el índice se construye al cargar
+            duplicates_file: Índice de duplicados guardado (mismo criterio que records_file)
+        """
+        if filename is None:
+            filename = APP_CONFIG['data_file']
+            records_file = records_file or APP_CONFIG['records_file']
+            duplicates_file = duplicates_file or APP_CONFIG['duplicates_file']
+        self.filename = filename
+        self.records_file = records_file
+        self.duplicates_file = duplicates_file
+        self._lock = threading.Lock()
+        self.current = DataVersion(None)
+
+    def refresh(self):
+        """Recarga los datos si el archivo o sus índices han cambiado; devuelve la DataVersion actual"""
+        # La sincronización escribe los índices después de las actividades: la
+        # versión incluye todos los archivos para no fijar una mezcla de ambos
+        mtimes = []
+        for path in (self.filename, self.duplicates_file, self.records_file):
+            try:
+                mtimes.append(str(os.path.getmtime(path)) if path else '-')
+            except OSError:
+                mtimes.append('0')
+        version = ':'.join(mtimes)
+        current = self.current
+        if version == current.version:
+            return current
+
+        with self._lock:
+            if version == self.current.version:
+                return self.current
+            logger.info(f"Cargando versión de datos {version}...")
+            try:
+                with open(self.filename, 'r', encoding='utf-8') as f:
+                    activities = json.load(f)
+            except (OSError, ValueError):
+                activities = []
+
+            # Todas las consultas usan la vista sin grabaciones duplicadas
+            duplicates_index = load_duplicates_index(self.duplicates_file) if self.duplicates_file else None
+            duplicates = (duplicates_index or DuplicateIndex.from_activities(activities)).duplicates()
+            activities = [activity for activity in activities if activity['id'] not in duplicates]
+
+            rows = []
+            for activity in activities:
+                start = activity.get('start_date_local') or activity.get('start_date')
+                if not start:
+                    continue
+                date = datetime.fromisoformat(start.replace('Z', '+00:00')).date()
+                rows.append((date.year, date.month, date, activity.get('type'), activity))
+
+            records = load_records_index(self.records_file) if self.records_file else None
+            self.current = DataVersion(
+                version,
+                rows=rows,
+                activities_by_id={activity['id']: activity for activity in activities},
+                records=records or RecordsIndex.from_activities(activities)
+            )
+            return self.current
+
+store = ActivityStore()
+
+def _parse_list(name, convert=str):
+    """Lee un parámetro repetido o separado por comas: ?year=2023&year=2024 o ?year=2023,2024"""
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(convert(value) for value in raw.split(',') if value.strip())
+    return sorted(set(values))
+
+def _filters():
+    return {
+        'years': _parse_list('year', int),
+        'months': _parse_list('month', int),
+        'types': _parse_list('type'),
+    }
+
+def _plain(totals):
+    """Convierte los defaultdict de summarize_activities en dicts serializables"""
+    if isinstance(totals, dict):
+        return {str(key): _plain(value) for key, value in totals.items()}
+    if isinstance(totals, list):
+        return [_plain(value) for value in totals]
+    if isinstance(totals, float):
+        return round(totals, 2)
+    return totals
+
+def _period(date, granularity):
+    if granularity == 'day':
+        return date.isoformat()
+    if granularity == 'week':
+        return (date - timedelta(days=date.weekday())).isoformat()
+    if granularity == 'month':
+        return f"{date.year}-{date.month:02d}"
+    return str(date.year)
+
+def _compute_totals(data, filters):
+    activities = [activity for _, activity in data.filter(**filters)]
+    by_sport = calculate_totals_by_sport(activities)
+    return {
+        'totals': {
+            'count': len(activities),
+            'distance': sum(data['distance'] for data in by_sport.values()),
+            'time': sum(data['time'] for data in by_sport.values()),
+            'elevation': sum(data['elevation'] for data in by_sport.values()),
+        },
+        'by_type': by_sport,
+        'by_year': calculate_totals_by_year(activities),
+    }
+
+def _compute_timeseries(data, filters, granularity):
+    series = {}
+    for date, activity in data.filter(**filters):
+        key = (_period(date, granularity), activity.get('type'))
+        point = series.get(key)
+        if point is None:
+            point = series[key] = {'period': key[0], 'type': key[1], 'count': 0,
+                                   'distance': 0.0, 'time': 0.0, 'elevation': 0.0}
+        point['count'] += 1
+        point['distance'] += (activity.get('distance') or 0) / 1000
+        point['time'] += (activity.get('moving_time') or 0) / 60
+        point['elevation'] += activity.get('total_elevation_gain') or 0
+    return {'granularity': granularity, 'series': [series[key] for key in sorted(series)]}
+
+def _compute_records(data, filters, metric, n):
+    types = filters['types'] or data.records.types()
+    allowed_ids = None
+    if filters['months']:
+        allowed_ids = {activity['id'] for _, activity in data.filter(**filters)}
+    result = {}
+    for activity_type in types:
+        entries = []
+        for activity_id, value in data.records.top(metric, activity_type, filters['years'] or None, n, allowed_ids):
+            activity = data.activities_by_id.get(activity_id, {})
+            entries.append({
+                'id': activity_id,
+                'name': activity.get('name'),
+                'start_date_local': activity.get('start_date_local'),
+                'value': value
+            })
+        if entries:
+            result[activity_type] = entries
+    return {'metric': metric, 'records': result}
+
+def _json_response(endpoint, compute):
+    """
+    Respuesta JSON con caché por versión, ETag/304 y gzip
+    El ETag depende solo de la versión de datos y de la consulta, así que un
+    304 se responde sin calcular nada. compute recibe la DataVersion de la
+    petición y la respuesta se cachea en esa misma versión.
+    """
+    data = store.refresh()
+    version = data.version
+    # Consulta normalizada: ?type=Run,Ride y ?type=Ride&type=Run comparten ETag y caché
+    query = sorted(
+        (key, sorted({value for raw in request.args.getlist(key) for value in raw.split(',') if value}))
+        for key in request.args
+    )
+    etag = hashlib.sha1(json.dumps([version, endpoint, query]).encode('utf-8')).hexdigest()
+    metrics.inc('strava_api_requests_total', endpoint=endpoint)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        def build():
+            body = json.dumps(_plain(dict(compute(data), version=version)), ensure_ascii=False).encode('utf-8')
+            compressed = gzip.compress(body, compresslevel=5) if len(body) >= GZIP_MIN_SIZE else None
+            return body, compressed
+
+        body, compressed = data.cached(json.dumps([endpoint, query]), build)
+        if compressed is not None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = Response(compressed, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(body, mimetype='application/json')
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def _error(message, status=400):
+    return Response(json.dumps({'error': message}, ensure_ascii=False), status=status, mimetype='application/json')
+
+@app.route('/api/version')
+def api_version():
+    return _json_response('version', lambda data: {'activities': len(data.rows)})
+
+@app.route('/api/totals')
+def api_totals():
+    """Totales por tipo y por año (distancia en km, tiempo en minutos, elevación en m)"""
+    try:
+        filters = _filters()
+    except ValueError:
+        return _error("Filtros no válidos")
+    return _json_response('totals', lambda data: _compute_totals(data, filters))
+
+@app.route('/api/timeseries')
+def api_timeseries():
+    """Serie temporal por periodo y tipo; granularity = day, week, month o year"""
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        return _error(f"granularity debe ser uno de {', '.join(GRANULARITIES)}")
+    try:
+        filters = _filters()
+    except ValueError:
+        return _error("Filtros no válidos")
+    return _json_response('timeseries', lambda data: _compute_timeseries(data, filters, granularity))
+
+@app.route('/api/records')
+def api_records():
+    """Top-N por métrica (valores en unidades de la API) para cada tipo"""
+    metric = request.args.get('metric', 'distance')
+    if metric not in RECORD_METRICS:
+        return _error(f"metric debe ser uno de {', '.join(RECORD_METRICS)}")
+    try:
+        filters = _filters()
+        n = min(int(request.args.get('n', 10)), 100)
+    except ValueError:
+        return _error("Filtros no válidos")
+    if n < 1:
+        return _error("n debe ser mayor que 0")
+    return _json_response('records', lambda data: _compute_records(data, filters, metric, n))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics.json')
+def json_metrics():
+    return Response(json.dumps(metrics.snapshot()), mimetype='application/json')
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON de consulta de actividades")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from app_settings import APP_CONFIG
+from http_cache import HttpCache
+from instrumentation import rate_limit_remaining
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Campos que solo devuelve el detalle /activities/{id}
+DETAIL_FIELDS = ('description', 'calories', 'device_name', 'average_cadence', 'average_watts', 'kilojoules')
+# Campos cuya ausencia indica que la actividad no se ha enriquecido todavía
+REQUIRED_DETAIL_FIELDS = ('description', 'calories')
+# Marca de las actividades cuyo detalle devolvió 404 (borradas o privadas)
+UNAVAILABLE_FIELD = 'detail_unavailable'
+# Actividades por página del listado (per_page por defecto de StravaClient.get_activities)
+LISTING_PAGE_SIZE = 200
+
+def needs_enrichment(activity):
+    """Indica si faltan campos de detalle (un valor None cuenta como ya enriquecido)"""
+    if activity.get(UNAVAILABLE_FIELD):
+        return False
+    return any(field not in activity for field in REQUIRED_DETAIL_FIELDS)
+
+def request_budget(activities, max_requests=None):
+    """
+    Calcula cuántos detalles se pueden pedir sin agotar la cuota de Strava
+    Se parte de la cuota restante según las cabeceras X-RateLimit-* y
+    X-ReadRateLimit-* del listado y se reservan las páginas que necesitará el
+    siguiente listado, para que la próxima sincronización no reciba un 429.
+    Args:
+        activities: Lista completa de actividades (determina las páginas del listado)
+        max_requests: Límite fijo adicional (None para no aplicarlo)
+    Returns:
+        Número máximo de peticiones de detalle, o None si no hay ningún límite
+    """
+    remaining = rate_limit_remaining()
+    if remaining is None:
+        return max_requests
+    # La última página del listado puede llegar vacía, por eso se suma una más
+    listing_pages = len(activities) // LISTING_PAGE_SIZE + 1
+    budget = max(remaining - listing_pages, 0)
+    return budget if max_requests is None else min(budget, max_requests)
+
+def get_http_cache():
+    """Crea la caché HTTP configurada en APP_CONFIG"""
+    return HttpCache(APP_CONFIG['http_cache_dir'], APP_CONFIG['http_cache_max_bytes'])
+
+def enrich_activities(client, activities, cache=None, max_workers=None, max_requests=None,
+                      force=False, revalidate_recent=0):
+    """
+    Completa las actividades con los campos del detalle, en paralelo y con caché
+    Args:
+        client: StravaClient autenticado
+        activities: Lista de actividades; se modifican en el sitio
+        cache: HttpCache (por defecto la configurada en APP_CONFIG)
+        max_workers: Peticiones simultáneas (por defecto APP_CONFIG['enrichment_workers'])
+        max_requests: Máximo de actividades a enriquecer en esta ejecución; se
+            reduce además según la cuota restante que informa Strava
+        force: Si es True, revalida también las que ya tienen los campos (304 si no cambian)
+        revalidate_recent: Número de actividades recientes ya enriquecidas que se
+            revalidan con If-None-Match para recoger ediciones posteriores
+    Returns:
+        Diccionario con el número de actividades enriquecidas, fallidas, no
+        disponibles (404) y si hubo limitación (429)
+    """
+    if cache is None:
+        cache = get_http_cache()
+    if max_workers is None:
+        max_workers = APP_CONFIG['enrichment_workers']
+
+    # Primero las más recientes, que son las que se consultan más
+    by_date = sorted(activities, key=lambda activity: activity.get('start_date') or '', reverse=True)
+    pending = [activity for activity in by_date if force or needs_enrichment(activity)]
+    if not force and revalidate_recent:
+        # Las pendientes tienen prioridad; después se revalidan las recientes
+        pending += [activity for activity in by_date
+                    if not needs_enrichment(activity) and not activity.get(UNAVAILABLE_FIELD)][:revalidate_recent]
+    budget = request_budget(activities, max_requests)
+    if budget is not None:
+        if budget < len(pending):
+            logger.info(f"Cuota de Strava: se piden {budget} de {len(pending)} detalles")
+        pending = pending[:budget]
+    if not pending:
+        return {'enriched': 0, 'failed': 0, 'unavailable': 0, 'throttled': False}
+
+    logger.info(f"Enriqueciendo {len(pending)} actividades con {max_workers} peticiones simultáneas...")
+    throttled = threading.Event()
+
+    def fetch(activity):
+        # Si Strava ya ha limitado las peticiones, no se lanzan más
+        if throttled.is_set():
+            return activity, None
+        try:
+            return activity, client.get_activity(activity['id'], cache=cache)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status == 429:
+                throttled.set()
+                logger.warning("Límite de peticiones de Strava alcanzado, se detiene el enriquecimiento")
+            elif status == 404:
+                logger.warning(f"La actividad {activity['id']} no tiene detalle disponible (404), no se volverá a pedir")
+                return activity, UNAVAILABLE_FIELD
+            else:
+                logger.error(f"Error obteniendo el detalle de {activity['id']}: {str(e)}")
+            return activity, None
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error obteniendo el detalle de {activity['id']}: {str(e)}")
+            return activity, None
+
+    enriched = 0
+    failed = 0
+    unavailable = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for activity, detail in executor.map(fetch, pending):
+            if detail is None:
+                failed += 1
+                continue
+            if detail == UNAVAILABLE_FIELD:
+                activity[UNAVAILABLE_FIELD] = True
+                unavailable += 1
+                continue
+            for field in DETAIL_FIELDS:
+                if field in detail or field in REQUIRED_DETAIL_FIELDS:
+                    activity[field] = detail.get(field)
+            enriched += 1
+
+    logger.info(f"Enriquecimiento completado: {enriched} actividades, {failed} sin completar, "
+                f"{unavailable} no disponibles")
+    return {'enriched': enriched, 'failed': failed, 'unavailable': unavailable,
+            'throttled': throttled.is_set()}
@@ -0,0 +1,322 @@
+import gzip
+import math
+import struct
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from polyline_codec import encode_polyline
+
+# Segundos entre la época de FIT (1989-12-31 UTC) y la época Unix
+FIT_EPOCH_OFFSET = 631065600
+FIT_RECORD_MESSAGE = 20
+SEMICIRCLES_TO_DEGREES = 180 / 2 ** 31
+
+# Tipos base de FIT: (formato struct, valor inválido)
+FIT_BASE_TYPES = {
+    0x00: ('B', 0xFF), 0x01: ('b', 0x7F), 0x02: ('B', 0xFF),
+    0x83: ('h', 0x7FFF), 0x84: ('H', 0xFFFF), 0x85: ('i', 0x7FFFFFFF),
+    0x86: ('I', 0xFFFFFFFF), 0x88: ('f', None), 0x89: ('d', None),
+    0x0A: ('B', 0x00), 0x8B: ('H', 0x0000), 0x8C: ('I', 0x00000000),
+    0x8E: ('q', 0x7FFFFFFFFFFFFFFF), 0x8F: ('Q', 0xFFFFFFFFFFFFFFFF), 0x90: ('Q', 0),
+}
+
+# Velocidad mínima (m/s) para considerar que un tramo cuenta como tiempo en movimiento
+MOVING_SPEED_THRESHOLD = 0.5
+# Umbral de histéresis (m) para acumular desnivel sin sumar ruido de altitud
+ELEVATION_HYSTERESIS = 2.0
+# Máximo de puntos de la polilínea resumida
+SUMMARY_POLYLINE_POINTS = 300
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.strip().replace('Z', '+00:00')).astimezone(timezone.utc)
+
+def _empty_points():
+    return {'time': [], 'latlng': [], 'altitude': [], 'heartrate': [], 'distance': []}
+
+def _append_point(points, when, lat=None, lng=None, altitude=None, heartrate=None, distance=None):
+    points['time'].append(when)
+    points['latlng'].append((lat, lng) if lat is not None and lng is not None else None)
+    points['altitude'].append(altitude)
+    points['heartrate'].append(heartrate)
+    points['distance'].append(distance)
+
+def _child_text(element, name):
+    for child in element:
+        if _local_name(child.tag) == name:
+            return child.text
+    return None
+
+def _find_descendant_text(element, name):
+    for child in element.iter():
+        if _local_name(child.tag) == name and child.text:
+            return child.text
+    return None
+
+def parse_gpx(data):
+    """Extrae los puntos de un fichero GPX"""
+    points = _empty_points()
+    root = ET.fromstring(data.lstrip())
+    for trkpt in root.iter():
+        if _local_name(trkpt.tag) != 'trkpt':
+            continue
+        when = _child_text(trkpt, 'time')
+        if when is None:
+            continue
+        altitude = _child_text(trkpt, 'ele')
+        heartrate = _find_descendant_text(trkpt, 'hr')
+        _append_point(
+            points,
+            _parse_time(when),
+            float(trkpt.get('lat')),
+            float(trkpt.get('lon')),
+            float(altitude) if altitude else None,
+            float(heartrate) if heartrate else None
+        )
+    return points
+
+def parse_tcx(data):
+    """Extrae los puntos de un fichero TCX"""
+    points = _empty_points()
+    root = ET.fromstring(data.lstrip())
+    for trackpoint in root.iter():
+        if _local_name(trackpoint.tag) != 'Trackpoint':
+            continue
+        when = _child_text(trackpoint, 'Time')
+        if when is None:
+            continue
+        lat = _find_descendant_text(trackpoint, 'LatitudeDegrees')
+        lng = _find_descendant_text(trackpoint, 'LongitudeDegrees')
+        altitude = _child_text(trackpoint, 'AltitudeMeters')
+        distance = _child_text(trackpoint, 'DistanceMeters')
+        heartrate = None
+        for child in trackpoint:
+            if _local_name(child.tag) == 'HeartRateBpm':
+                heartrate = _child_text(child, 'Value')
+        _append_point(
+            points,
+            _parse_time(when),
+            float(lat) if lat else None,
+            float(lng) if lng else None,
+            float(altitude) if altitude else None,
+            float(heartrate) if heartrate else None,
+            float(distance) if distance else None
+        )
+    return points
+
+def _fit_value(raw, invalid):
+    if invalid is not None and raw == invalid:
+        return None
+    if isinstance(raw, float) and math.isnan(raw):
+        return None
+    return raw
+
+def parse_fit(data):
+    """
+    Extrae los mensajes 'record' de un fichero FIT binario
+    Solo decodifica los campos necesarios (tiempo, posición, altitud,
+    frecuencia cardiaca y distancia) y descarta el resto.
+    """
+    points = _empty_points()
+    header_size = data[0]
+    if data[8:12] != b'.FIT':
+        raise ValueError("El fichero no tiene cabecera FIT")
+    data_size = struct.unpack('<I', data[4:8])[0]
+    end = header_size + data_size
+    offset = header_size
+    definitions = {}
+    last_timestamp = None
+
+    while offset < end:
+        record_header = data[offset]
+        offset += 1
+
+        if record_header & 0x80:
+            # Cabecera con marca de tiempo comprimida
+            local_type = (record_header >> 5) & 0x03
+            time_offset = record_header & 0x1F
+            if last_timestamp is not None:
+                timestamp = (last_timestamp & ~0x1F) + time_offset
+                if time_offset < (last_timestamp & 0x1F):
+                    timestamp += 0x20
+                last_timestamp = timestamp
+            compressed = True
+        else:
+            local_type = record_header & 0x0F
+            compressed = False
+
+            if record_header & 0x40:
+                # Mensaje de definición
+                endian = '>' if data[offset + 1] == 1 else '<'
+                global_type = struct.unpack(endian + 'H', data[offset + 2:offset + 4])[0]
+                num_fields = data[offset + 4]
+                offset += 5
+                fields = []
+                for _ in range(num_fields):
+                    fields.append((data[offset], data[offset + 1], data[offset + 2]))
+                    offset += 3
+                dev_size = 0
+                if record_header & 0x20:
+                    num_dev_fields = data[offset]
+                    offset += 1
+                    for _ in range(num_dev_fields):
+                        dev_size += data[offset + 1]
+                        offset += 3
+                definitions[local_type] = (endian, global_type, fields, dev_size)
+                continue
+
+        definition = definitions.get(local_type)
+        if definition is None:
+            raise ValueError(f"Mensaje FIT sin definición (tipo local {local_type})")
+        endian, global_type, fields, dev_size = definition
+
+        values = {}
+        for field_num, size, base_type in fields:
+            fmt, invalid = FIT_BASE_TYPES.get(base_type, (None, None))
+            wanted = global_type == FIT_RECORD_MESSAGE or field_num == 253
+            if wanted and fmt is not None and struct.calcsize(fmt) == size:
+                values[field_num] = _fit_value(struct.unpack(endian + fmt, data[offset:offset + size])[0], invalid)
+            offset += size
+        offset += dev_size
+
+        if global_type != FIT_RECORD_MESSAGE:
+            if 253 in values and values[253] is not None:
+                last_timestamp = values[253]
+            continue
+
+        if values.get(253) is not None:
+            last_timestamp = values[253]
+        elif not compressed or last_timestamp is None:
+            continue
+
+        lat = values.get(0)
+        lng = values.get(1)
+        altitude = values.get(78) if values.get(78) is not None else values.get(2)
+        distance = values.get(5)
+        _append_point(
+            points,
+            datetime.fromtimestamp(last_timestamp + FIT_EPOCH_OFFSET, tz=timezone.utc),
+            lat * SEMICIRCLES_TO_DEGREES if lat is not None else None,
+            lng * SEMICIRCLES_TO_DEGREES if lng is not None else None,
+            altitude / 5 - 500 if altitude is not None else None,
+            float(values[3]) if values.get(3) is not None else None,
+            distance / 100 if distance is not None else None
+        )
+
+    return points
+
+PARSERS = {
+    '.gpx': parse_gpx,
+    '.tcx': parse_tcx,
+    '.fit': parse_fit,
+}
+
+def parse_activity_file(filename, data):
+    """
+    Parsea un fichero de actividad (GPX, TCX o FIT, opcionalmente comprimido con gzip)
+    Returns:
+        Diccionario de puntos o None si el formato no está soportado
+    """
+    name = filename.lower()
+    if name.endswith('.gz'):
+        data = gzip.decompress(data)
+        name = name[:-3]
+    for extension, parser in PARSERS.items():
+        if name.endswith(extension):
+            return parser(data)
+    return None
+
+def _haversine(lat1, lng1, lat2, lng2):
+    """Distancia en metros entre dos puntos"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+def summarize_points(points):
+    """
+    Calcula los campos resumen de una actividad y sus streams a partir de los puntos
+    Returns:
+        Tupla (campos con el esquema de la API, streams en formato key_by_type de Strava)
+    """
+    times = points['time']
+    if not times:
+        return {}, {}
+
+    start = times[0]
+    offsets = [int((t - start).total_seconds()) for t in times]
+
+    # Distancia acumulada: la del fichero si existe, si no la calculada desde las posiciones
+    distances = []
+    total = 0.0
+    previous = None
+    for latlng, distance in zip(points['latlng'], points['distance']):
+        if distance is not None:
+            total = distance
+        elif latlng is not None and previous is not None:
+            total += _haversine(previous[0], previous[1], latlng[0], latlng[1])
+        if latlng is not None:
+            previous = latlng
+        distances.append(round(total, 1))
+
+    moving_time = 0
+    max_speed = 0.0
+    for i in range(1, len(offsets)):
+        dt = offsets[i] - offsets[i - 1]
+        if dt <= 0:
+            continue
+        speed = (distances[i] - distances[i - 1]) / dt
+        if speed > MOVING_SPEED_THRESHOLD:
+            moving_time += dt
+            max_speed = max(max_speed, speed)
+
+    altitudes = [a for a in points['altitude'] if a is not None]
+    elevation_gain = 0.0
+    if altitudes:
+        reference = altitudes[0]
+        for altitude in altitudes[1:]:
+            if altitude - reference >= ELEVATION_HYSTERESIS:
+                elevation_gain += altitude - reference
+                reference = altitude
+            elif altitude < reference:
+                reference = altitude
+
+    heartrates = [h for h in points['heartrate'] if h is not None]
+    latlngs = [latlng for latlng in points['latlng'] if latlng is not None]
+    distance = distances[-1]
+
+    summary = {
+        'start_date': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'distance': distance,
+        'moving_time': moving_time,
+        'elapsed_time': offsets[-1],
+        'total_elevation_gain': round(elevation_gain, 1),
+        'average_speed': round(distance / moving_time, 3) if moving_time else 0.0,
+        'max_speed': round(max_speed, 3),
+        'has_heartrate': bool(heartrates),
+        'average_heartrate': round(sum(heartrates) / len(heartrates), 1) if heartrates else None,
+        'max_heartrate': max(heartrates) if heartrates else None,
+        'elev_high': round(max(altitudes), 1) if altitudes else None,
+        'elev_low': round(min(altitudes), 1) if altitudes else None,
+        'start_latlng': [round(c, 6) for c in latlngs[0]] if latlngs else [],
+        'end_latlng': [round(c, 6) for c in latlngs[-1]] if latlngs else [],
+    }
+    if latlngs:
+        step = max(1, math.ceil(len(latlngs) / SUMMARY_POLYLINE_POINTS))
+        sampled = latlngs[::step]
+        if sampled[-1] != latlngs[-1]:
+            sampled.append(latlngs[-1])
+        summary['summary_polyline'] = encode_polyline(sampled)
+
+    streams = {
+        'time': {'data': offsets},
+        'distance': {'data': distances},
+    }
+    if latlngs:
+        streams['latlng'] = {'data': [list(latlng) if latlng else None for latlng in points['latlng']]}
+    if altitudes:
+        streams['altitude'] = {'data': points['altitude']}
+    if heartrates:
+        streams['heartrate'] = {'data': points['heartrate']}
+
+    return summary, streams
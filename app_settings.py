@@ -0,0 +1,26 @@
+import os
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env (solo para desarrollo local)
+load_dotenv()
+
+# Configuración de la aplicación
+APP_CONFIG = {
+    'data_file': 'strava_activities.json',
+    'tokens_file': 'strava_tokens.json',
+    'streams_dir': 'strava_streams',
+    'records_file': 'strava_records.json',
+    'duplicates_file': 'strava_duplicates.json',
+    'routes_file': 'strava_routes.json',
+    'summary_cache_dir': 'strava_summary_cache',
+    'http_cache_dir': 'strava_http_cache',
+    'http_cache_max_bytes': 100 * 1024 * 1024,  # 100 MB
+    'enrichment_workers': 4,
+    'enrichment_max_requests': 80,  # Tope por sincronización; además se respeta la cuota que informa Strava
+    'enrichment_revalidate_recent': 10,  # Actividades recientes que se revalidan con su ETag en cada sincronización
+    'update_interval': 86400,  # 24 horas en segundos
+    'metrics_file': 'strava_metrics.prom',
+    'metrics_json_file': 'strava_metrics.json',
+    'profile_dir': 'profiles',
+    'profile_enabled': os.getenv('STRAVA_PROFILE') == '1'
+}
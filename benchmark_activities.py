@@ -0,0 +1,213 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from synthetic_activities import generate_activities
+
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+# Por encima de este tamaño no se ejecuta el benchmark HTTP (5.000 páginas de 200)
+MAX_HTTP_SIZE = 1000000
+
+def _git_commit():
+    """Devuelve el commit actual del repositorio o None si no está disponible"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def measure(func, repeat=3, setup=None):
+    """
+    Mide el tiempo de ejecución de una función
+    Args:
+        func: Función a medir; recibe el resultado de setup si se indica
+        repeat: Número de repeticiones
+        setup: Función que prepara los argumentos de cada repetición (no se mide)
+    """
+    timings = []
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return {
+        'repeat': repeat,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'max_s': max(timings)
+    }
+
+def load_test(base_url, paths, total_requests=2000, concurrency=8, headers=None):
+    """
+    Lanza peticiones concurrentes contra un servidor HTTP local
+    Returns:
+        Diccionario con peticiones por segundo, latencias p50/p95 y errores
+    """
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+
+    local = threading.local()
+
+    def fetch(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        response = session.get(base_url + paths[i % len(paths)], headers=headers)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'requests_per_s': total_requests / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'errors': sum(1 for _, status in results if status >= 400)
+    }
+
+def benchmark_api(activities_file, total_requests=2000, concurrency=8):
+    """Prueba de carga de activities_api con un servidor local sobre activities_file"""
+    from werkzeug.serving import make_server
+    import activities_api
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    activities_api.store = activities_api.ActivityStore(activities_file)
+    server = make_server('127.0.0.1', 0, activities_api.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    paths = [
+        '/api/totals',
+        '/api/totals?type=Ride',
+        '/api/totals?year=2012,2013&type=Run',
+        '/api/timeseries?granularity=month',
+        '/api/timeseries?granularity=week&type=Ride',
+        '/api/records?metric=distance&type=Ride',
+        '/api/records?metric=average_speed&year=2012',
+    ]
+    try:
+        return load_test(base_url, paths, total_requests, concurrency, headers={'Accept-Encoding': 'gzip'})
+    finally:
+        server.shutdown()
+
+def benchmark_size(size, repeat=3, seed=0, skip_http=False):
+    """Ejecuta todos los benchmarks para un tamaño de dataset"""
+    # Importaciones diferidas: dependen de streamlit y de la configuración
+    from strava_data_extractor import save_activities
+    from strava_client import StravaClient
+    from summarize_activities import calculate_totals_by_sport, calculate_totals_by_year
+    from strava_simulator import SimulatorState, start_simulator
+    from visualize_activities import (
+        load_data, prepare_data, compute_monthly_counts, compute_weekly_counts,
+        compute_stats_by_type, compute_yearly_stats, compute_monthly_stats
+    )
+
+    results = []
+
+    def record(name, timing):
+        timing.update({'benchmark': name, 'size': size})
+        timing['throughput_per_s'] = size / timing['median_s'] if timing['median_s'] > 0 else None
+        results.append(timing)
+        print(f"{name:<32} n={size:<8} mediana={timing['median_s']:.4f}s")
+
+    print(f"Generando {size} actividades sintéticas...")
+    activities = generate_activities(size, seed=seed)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_file = os.path.join(tmpdir, 'strava_activities.json')
+
+        record('save_activities', measure(
+            lambda: save_activities(activities, filename=data_file, silent=True), repeat
+        ))
+        record('load_data', measure(lambda: load_data(data_file), repeat))
+
+        raw_df = load_data(data_file)
+        record('prepare_data', measure(prepare_data, repeat, setup=raw_df.copy))
+        df = prepare_data(raw_df.copy())
+
+        for func in (compute_monthly_counts, compute_weekly_counts, compute_stats_by_type,
+                     compute_yearly_stats, compute_monthly_stats):
+            record(func.__name__, measure(lambda: func(df), repeat))
+
+        if not skip_http:
+            result = benchmark_api(data_file)
+            result.update({'benchmark': 'api_load_test', 'size': size, 'throughput_per_s': result['requests_per_s']})
+            results.append(result)
+            print(f"{'api_load_test':<32} n={size:<8} {result['requests_per_s']:.0f} req/s "
+                  f"p95={result['p95_ms']:.1f}ms errores={result['errors']}")
+
+    record('calculate_totals_by_sport', measure(lambda: calculate_totals_by_sport(activities), repeat))
+    record('calculate_totals_by_year', measure(lambda: calculate_totals_by_year(activities), repeat))
+
+    if not skip_http and size <= MAX_HTTP_SIZE:
+        # Simulador local de la API, sin latencia añadida ni límites de cuota
+        state = SimulatorState(activities, rate_limit=None, read_rate_limit=None)
+        server, api_url, _ = start_simulator(state)
+        try:
+            client = StravaClient('benchmark-token')
+            client.base_url = api_url
+            record('get_activities', measure(client.get_activities, repeat))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    return results
+
+def run_benchmarks(sizes, repeat=3, seed=0, skip_http=False):
+    """Ejecuta el benchmark completo y devuelve un documento serializable a JSON"""
+    import pandas as pd
+
+    run = {
+        'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': []
+    }
+    for size in sizes:
+        run['results'].extend(benchmark_size(size, repeat, seed, skip_http))
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del procesamiento de actividades")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Tamaños de dataset a medir")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por benchmark")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla del generador sintético")
+    parser.add_argument('--skip-http', action='store_true', help="No medir get_activities")
+    parser.add_argument('--output', default='bench_results.jsonl',
+                        help="Fichero JSON Lines donde se añade el resultado de cada ejecución")
+    args = parser.parse_args()
+
+    # Silenciar los logs por página de los módulos medidos; el progreso se muestra con print
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', force=True)
+
+    run = run_benchmarks(args.sizes, args.repeat, args.seed, args.skip_http)
+    with open(args.output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run) + '\n')
+    print(f"Resultados añadidos a '{args.output}'")
+
+if __name__ == "__main__":
+    main()
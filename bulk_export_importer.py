@@ -0,0 +1,230 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from activity_file_parsers import parse_activity_file, summarize_points
+from app_settings import APP_CONFIG
+from instrumentation import span, export_metrics
+from records_index import update_records_index
+from deduplication import deduplicate, update_duplicates_index
+from route_matching import update_route_index
+from strava_data_extractor import load_stored_activities, merge_activities, save_activities
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Formatos de fecha de "Activity Date" en activities.csv (siempre en UTC)
+EXPORT_DATE_FORMATS = ('%b %d, %Y, %I:%M:%S %p', '%d %b %Y, %H:%M:%S', '%Y-%m-%d %H:%M:%S')
+
+# Columnas de activities.csv -> campos de la API y conversión
+# Cuando la columna está repetida (p. ej. "Distance" en km y en metros) se usa la última aparición,
+# que es la que viene en unidades del sistema internacional
+EXPORT_COLUMNS = {
+    'Activity Name': ('name', str),
+    'Activity Description': ('description', str),
+    'Elapsed Time': ('elapsed_time', lambda v: int(float(v))),
+    'Moving Time': ('moving_time', lambda v: int(float(v))),
+    'Distance': ('distance', float),
+    'Max Speed': ('max_speed', float),
+    'Average Speed': ('average_speed', float),
+    'Elevation Gain': ('total_elevation_gain', float),
+    'Elevation Low': ('elev_low', float),
+    'Elevation High': ('elev_high', float),
+    'Max Heart Rate': ('max_heartrate', float),
+    'Average Heart Rate': ('average_heartrate', float),
+    'Calories': ('calories', float),
+}
+
+# Worker: zip abierto una sola vez por proceso
+_worker_zip = None
+_worker_streams_dir = None
+
+def _parse_export_date(value):
+    """Convierte 'Activity Date' del export a formato ISO de la API"""
+    for date_format in EXPORT_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value.strip(), date_format).replace(tzinfo=timezone.utc)
+            return parsed.strftime('%Y-%m-%dT%H:%M:%SZ')
+        except ValueError:
+            continue
+    return None
+
+def _normalize_type(value):
+    """'Inline Skate' -> 'InlineSkate', 'E-Bike Ride' -> 'EBikeRide'"""
+    return value.replace(' ', '').replace('-', '')
+
+def read_export_index(zf):
+    """Lee activities.csv del export y devuelve una fila (dict) por actividad"""
+    name = next((n for n in zf.namelist() if n.rsplit('/', 1)[-1] == 'activities.csv'), None)
+    if name is None:
+        raise ValueError("El archivo no contiene activities.csv")
+
+    with zf.open(name) as f:
+        reader = csv.reader(io.TextIOWrapper(f, encoding='utf-8-sig'))
+        header = next(reader)
+        rows = []
+        for values in reader:
+            # dict() se queda con la última aparición de cada columna repetida
+            rows.append(dict(zip(header, values)))
+    return rows
+
+def normalize_export_row(row):
+    """Convierte una fila de activities.csv al esquema de actividad que guarda save_activities"""
+    start_date = _parse_export_date(row.get('Activity Date', ''))
+    activity = {
+        'resource_state': 2,
+        'id': int(row['Activity ID']),
+        'type': _normalize_type(row.get('Activity Type', '')),
+        'sport_type': _normalize_type(row.get('Activity Type', '')),
+        'start_date': start_date,
+        # El export no incluye la zona horaria; se usa UTC como hora local
+        'start_date_local': start_date,
+        'commute': row.get('Commute', '').lower() == 'true',
+        'external_id': row.get('Filename') or None,
+        'manual': not row.get('Filename'),
+    }
+    for column, (field, convert) in EXPORT_COLUMNS.items():
+        value = row.get(column, '').strip()
+        if not value:
+            activity[field] = None
+            continue
+        try:
+            activity[field] = convert(value)
+        except ValueError:
+            activity[field] = None
+    activity['has_heartrate'] = activity['average_heartrate'] is not None
+    return activity
+
+def _init_worker(zip_path, streams_dir):
+    global _worker_zip, _worker_streams_dir
+    _worker_zip = zipfile.ZipFile(zip_path)
+    _worker_streams_dir = streams_dir
+
+def _parse_export_file(task):
+    """
+    Parsea un fichero de actividad del export dentro de un proceso del pool
+    y guarda sus streams en disco para no devolverlos al proceso principal
+    Returns:
+        Tupla (id, campos resumen, error)
+    """
+    activity_id, member = task
+    try:
+        points = parse_activity_file(member, _worker_zip.read(member))
+        if points is None:
+            return activity_id, None, f"Formato no soportado: {member}"
+        summary, streams = summarize_points(points)
+        if streams and _worker_streams_dir:
+            with open(os.path.join(_worker_streams_dir, f"{activity_id}.json"), 'w', encoding='utf-8') as f:
+                json.dump(streams, f)
+        return activity_id, summary, None
+    except Exception as e:
+        return activity_id, None, f"{member}: {str(e)}"
+
+def _apply_summary(activity, summary):
+    """Rellena los campos vacíos de la fila del CSV con los calculados desde el fichero"""
+    polyline = summary.pop('summary_polyline', None)
+    for key, value in summary.items():
+        if activity.get(key) is None:
+            activity[key] = value
+    activity['has_heartrate'] = activity.get('average_heartrate') is not None
+    if activity.get('start_date_local') is None:
+        activity['start_date_local'] = activity['start_date']
+    if polyline:
+        activity['map'] = {'id': f"a{activity['id']}", 'summary_polyline': polyline, 'resource_state': 2}
+
+def import_bulk_export(zip_path, data_file=None, streams_dir=None, include_streams=True,
+                       max_workers=None, silent=False):
+    """
+    Importa el archivo ZIP de exportación masiva de Strava sin llamadas a la API
+    Args:
+        zip_path: Ruta del ZIP (activities.csv y ficheros GPX/TCX/FIT)
+        data_file: Archivo de actividades donde combinar (por defecto APP_CONFIG['data_file'])
+        streams_dir: Directorio de streams (por defecto APP_CONFIG['streams_dir'])
+        include_streams: Si es False, solo se importan los datos de activities.csv
+        max_workers: Número de procesos del pool (por defecto, uno por CPU)
+        silent: Si es True, no muestra mensajes en consola
+    """
+    try:
+        with span('bulk_import'):
+            with span('bulk_import_read_index'):
+                with zipfile.ZipFile(zip_path) as zf:
+                    rows = read_export_index(zf)
+                    members = set(zf.namelist())
+
+            activities = {}
+            tasks = []
+            for row in rows:
+                activity = normalize_export_row(row)
+                activities[activity['id']] = activity
+                filename = row.get('Filename')
+                if include_streams and filename and filename in members:
+                    tasks.append((activity['id'], filename))
+
+            logger.info(f"Export con {len(activities)} actividades y {len(tasks)} ficheros de actividad")
+
+            errors = []
+            if tasks:
+                if streams_dir is None:
+                    streams_dir = APP_CONFIG['streams_dir']
+                os.makedirs(streams_dir, exist_ok=True)
+
+                with span('bulk_import_parse_files'):
+                    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                             initargs=(zip_path, streams_dir)) as executor:
+                        chunksize = max(1, len(tasks) // ((max_workers or os.cpu_count() or 1) * 8))
+                        for activity_id, summary, error in executor.map(_parse_export_file, tasks, chunksize=chunksize):
+                            if error:
+                                errors.append(error)
+                                logger.warning(f"No se pudo parsear la actividad {activity_id}: {error}")
+                            elif summary:
+                                _apply_summary(activities[activity_id], summary)
+
+            with span('bulk_import_merge'):
+                merged = merge_activities(load_stored_activities(data_file), activities.values())
+
+            with span('save_activities'):
+                saved = save_activities(merged, filename=data_file, silent=silent)
+
+        if not saved:
+            return {'success': False, 'error': "Error al guardar las actividades"}
+
+        with span('update_duplicates_index'):
+            unique_activities = deduplicate(merged, update_duplicates_index(merged))
+        with span('update_records_index'):
+            update_records_index(unique_activities)
+        with span('update_route_index'):
+            update_route_index(unique_activities)
+
+        logger.info(f"Importación completada: {len(activities)} actividades, {len(errors)} errores")
+        return {'success': True, 'activities': len(merged), 'imported': len(activities), 'errors': errors}
+
+    except Exception as e:
+        error_msg = f"Error importando el export: {str(e)}"
+        logger.error(error_msg)
+        return {'success': False, 'error': error_msg}
+    finally:
+        export_metrics()
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa la exportación masiva de Strava (ZIP)")
+    parser.add_argument('zip_path', help="Ruta del archivo ZIP exportado desde Strava")
+    parser.add_argument('--workers', type=int, default=None, help="Número de procesos")
+    parser.add_argument('--no-streams', action='store_true', help="No parsear los ficheros GPX/TCX/FIT")
+    args = parser.parse_args()
+
+    resultado = import_bulk_export(args.zip_path, include_streams=not args.no_streams, max_workers=args.workers)
+    if resultado['success']:
+        print(f"Importadas {resultado['imported']} actividades ({resultado['activities']} en total)")
+        if resultado['errors']:
+            print(f"{len(resultado['errors'])} ficheros no se pudieron parsear")
+    else:
+        print(f"Error: {resultado['error']}")
+
+if __name__ == "__main__":
+    main()
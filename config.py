@@ -1,43 +1,63 @@
 import os
+import logging
 from dotenv import load_dotenv
 import streamlit as st
+# APP_CONFIG vive en app_settings.py para poder usarla sin streamlit; se reexporta aquí
+from app_settings import APP_CONFIG
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno desde .env (solo para desarrollo local)
 load_dotenv()
 
-def get_strava_credentials():
-    """Obtiene las credenciales de Strava según el entorno"""
+def _streamlit_secret(key):
+    """
+    Devuelve st.secrets["strava"][key] o None si no hay secrets.toml
+    Se comprueba antes con load_if_toml_exists para que la ausencia del
+    archivo no muestre errores en el dashboard.
+    """
     try:
-        # Primero intentamos obtener las credenciales de Streamlit
-        client_id = st.secrets["strava"]["client_id"]
-        client_secret = st.secrets["strava"]["client_secret"]
-        print("Usando credenciales de Streamlit")
+        if not st.secrets.load_if_toml_exists():
+            return None
+        return st.secrets["strava"][key]
     except Exception:
+        return None
+
+def get_strava_credentials():
+    """Obtiene las credenciales de Strava según el entorno"""
+    # Primero intentamos obtener las credenciales de Streamlit
+    client_id = _streamlit_secret("client_id")
+    client_secret = _streamlit_secret("client_secret")
+    if client_id and client_secret:
+        logger.info("Usando credenciales de Streamlit")
+    else:
         # Si no están disponibles, usamos las variables de entorno
         client_id = os.getenv('STRAVA_CLIENT_ID')
         client_secret = os.getenv('STRAVA_CLIENT_SECRET')
-        print("Usando credenciales locales")
+        logger.info("Usando credenciales locales")
     
     return client_id, client_secret
 
+def get_redirect_uri():
+    """Obtiene la URL de redirección de OAuth según el entorno"""
+    return _streamlit_secret("redirect_uri") or os.getenv('STRAVA_REDIRECT_URI', 'http://localhost:8501')
+
+_client_id, _client_secret = get_strava_credentials()
+
 # Configuración de Strava
 STRAVA_CONFIG = {
-    'client_id': st.secrets["strava"]["client_id"],
-    'client_secret': st.secrets["strava"]["client_secret"],
+    'client_id': _client_id,
+    'client_secret': _client_secret,
     'auth_url': 'https://www.strava.com/oauth/authorize',
-    'token_url': 'https://www.strava.com/oauth/token',
-    'api_url': 'https://www.strava.com/api/v3',
-    'redirect_uri': st.secrets["strava"]["redirect_uri"],
+    # Se pueden apuntar a strava_simulator.py para pruebas de carga locales
+    'token_url': os.getenv('STRAVA_TOKEN_URL', 'https://www.strava.com/oauth/token'),
+    'api_url': os.getenv('STRAVA_API_URL', 'https://www.strava.com/api/v3'),
+    'redirect_uri': get_redirect_uri(),
     'scope': 'read,activity:read'
 }
 
-# Configuración de la aplicación
-APP_CONFIG = {
-    'data_file': 'strava_activities.json',
-    'tokens_file': 'strava_tokens.json',
-    'update_interval': 86400  # 24 horas en segundos
-}
-
 def validate_config():
     """Valida que las variables de entorno necesarias estén configuradas"""
     if not STRAVA_CONFIG['client_id'] or not STRAVA_CONFIG['client_secret']:
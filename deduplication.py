@@ -0,0 +1,279 @@
+import bisect
+import json
+import logging
+import os
+from datetime import datetime
+from app_settings import APP_CONFIG
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tipos que un dispositivo u otro pueden registrar de forma distinta para la misma actividad
+TYPE_FAMILIES = (
+    {'Ride', 'VirtualRide', 'EBikeRide', 'GravelRide', 'MountainBikeRide', 'Velomobile', 'Handcycle'},
+    {'Run', 'TrailRun', 'VirtualRun'},
+    {'Walk', 'Hike'},
+)
+# Fracción mínima del intervalo más largo que deben compartir dos actividades
+MIN_OVERLAP_RATIO = 0.5
+# Puntuación mínima (0-1) para considerar duplicado un par solapado
+DUPLICATE_SCORE_THRESHOLD = 0.8
+
+def _type_similarity(type_a, type_b):
+    if type_a == type_b:
+        return 1.0
+    for family in TYPE_FAMILIES:
+        if type_a in family and type_b in family:
+            return 0.7
+    return 0.0
+
+def _interval(activity):
+    """Devuelve (inicio, fin) en segundos Unix o None si la actividad no tiene fecha"""
+    start = activity.get('start_date') or activity.get('start_date_local')
+    if not start:
+        return None
+    start_ts = int(datetime.fromisoformat(start.replace('Z', '+00:00')).timestamp())
+    duration = activity.get('elapsed_time') or activity.get('moving_time') or 0
+    return start_ts, start_ts + max(int(duration), 1)
+
+def _quality(activity):
+    """Preferencia para conservar una actividad frente a sus duplicados (mayor es mejor)"""
+    has_gps = bool((activity.get('map') or {}).get('summary_polyline'))
+    return [
+        int(bool(activity.get('has_heartrate'))),
+        int(has_gps),
+        int(not activity.get('manual')),
+        float(activity.get('distance') or 0)
+    ]
+
+def score_pair(a, b):
+    """
+    Puntúa un par de actividades solapadas entre 0 y 1
+    Args:
+        a, b: Entradas del índice con 'start', 'end', 'type' y 'distance'
+    Returns:
+        Tupla (puntuación, fracción de solape sobre el intervalo más largo)
+    """
+    overlap = min(a['end'], b['end']) - max(a['start'], b['start'])
+    if overlap <= 0:
+        return 0.0, 0.0
+    overlap_ratio = overlap / max(a['end'] - a['start'], b['end'] - b['start'])
+    type_similarity = _type_similarity(a['type'], b['type'])
+    longest = max(a['distance'], b['distance'])
+    distance_similarity = 1.0 - abs(a['distance'] - b['distance']) / longest if longest > 0 else 1.0
+    score = 0.5 * overlap_ratio + 0.3 * distance_similarity + 0.2 * type_similarity
+    return score, overlap_ratio
+
+class DuplicateIndex:
+    """
+    Índice de intervalos [inicio, inicio + elapsed_time] para detectar duplicados
+    Los intervalos se guardan ordenados por inicio; los candidatos a solapar
+    con una actividad son los que empiezan en [inicio - duración máxima, fin),
+    que se localizan por búsqueda binaria. Construirlo es O(n log n) y cada
+    alta o edición en una sincronización solo compara con sus vecinos.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._entries = {}
+        self._edges = {}
+        self._max_duration = 0
+
+    @staticmethod
+    def _entry(activity):
+        interval = _interval(activity)
+        if interval is None:
+            return None
+        return {
+            'start': interval[0],
+            'end': interval[1],
+            'type': activity.get('type'),
+            'distance': float(activity.get('distance') or 0),
+            'quality': _quality(activity)
+        }
+
+    def _candidates(self, entry):
+        """Ids cuyo intervalo puede solapar con entry"""
+        low = bisect.bisect_left(self._starts, (entry['start'] - self._max_duration,))
+        high = bisect.bisect_left(self._starts, (entry['end'],))
+        return [activity_id for _, activity_id in self._starts[low:high]]
+
+    def _link(self, id_a, id_b):
+        self._edges.setdefault(id_a, set()).add(id_b)
+        self._edges.setdefault(id_b, set()).add(id_a)
+
+    def _delete(self, activity_id):
+        entry = self._entries.pop(activity_id, None)
+        if entry is None:
+            return
+        position = bisect.bisect_left(self._starts, (entry['start'], activity_id))
+        if position < len(self._starts) and self._starts[position] == (entry['start'], activity_id):
+            del self._starts[position]
+        for other in self._edges.pop(activity_id, ()):
+            self._edges[other].discard(activity_id)
+            if not self._edges[other]:
+                del self._edges[other]
+
+    def upsert(self, activity):
+        """
+        Añade o actualiza una actividad y la compara con las que se solapan
+        Returns:
+            True si el índice ha cambiado
+        """
+        activity_id = activity['id']
+        entry = self._entry(activity)
+        if self._entries.get(activity_id) == entry:
+            return False
+        self._delete(activity_id)
+        if entry is None:
+            return True
+
+        for other_id in self._candidates(entry):
+            score, overlap_ratio = score_pair(entry, self._entries[other_id])
+            if overlap_ratio >= MIN_OVERLAP_RATIO and score >= DUPLICATE_SCORE_THRESHOLD \
+                    and _type_similarity(entry['type'], self._entries[other_id]['type']) > 0:
+                self._link(activity_id, other_id)
+
+        bisect.insort(self._starts, (entry['start'], activity_id))
+        self._entries[activity_id] = entry
+        self._max_duration = max(self._max_duration, entry['end'] - entry['start'])
+        return True
+
+    def remove(self, activity_id):
+        """Elimina una actividad del índice"""
+        self._delete(activity_id)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ids(self):
+        """Ids de las actividades indexadas"""
+        return list(self._entries)
+
+    def groups(self):
+        """Grupos de actividades duplicadas entre sí (componentes conexas de los pares)"""
+        seen = set()
+        groups = []
+        for activity_id in self._edges:
+            if activity_id in seen:
+                continue
+            group = []
+            pending = [activity_id]
+            seen.add(activity_id)
+            while pending:
+                current = pending.pop()
+                group.append(current)
+                for other in self._edges.get(current, ()):
+                    if other not in seen:
+                        seen.add(other)
+                        pending.append(other)
+            groups.append(group)
+        return groups
+
+    def duplicates(self):
+        """
+        Devuelve {id duplicado: id que se conserva}
+        En cada grupo se conserva la actividad más completa (pulso, GPS, no
+        manual, mayor distancia) y, a igualdad, la subida primero (menor id).
+        """
+        result = {}
+        for group in self.groups():
+            primary = max(group, key=lambda activity_id: (self._entries[activity_id]['quality'], -activity_id))
+            for activity_id in group:
+                if activity_id != primary:
+                    result[activity_id] = primary
+        return result
+
+    def to_dict(self):
+        return {
+            'entries': {str(activity_id): entry for activity_id, entry in self._entries.items()},
+            'edges': {str(activity_id): sorted(others) for activity_id, others in self._edges.items()},
+            'max_duration': self._max_duration
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        index._entries = {int(activity_id): entry for activity_id, entry in data['entries'].items()}
+        index._edges = {int(activity_id): set(others) for activity_id, others in data['edges'].items()}
+        index._starts = sorted((entry['start'], activity_id) for activity_id, entry in index._entries.items())
+        index._max_duration = data['max_duration']
+        return index
+
+    @classmethod
+    def from_activities(cls, activities):
+        """Construye el índice con un barrido por orden de inicio"""
+        index = cls()
+        entries = [(index._entry(activity), activity) for activity in activities]
+        entries.sort(key=lambda item: item[0]['start'] if item[0] else 0)
+        for _, activity in entries:
+            index.upsert(activity)
+        return index
+
+def load_duplicates_index(filename=None):
+    """Carga el índice de duplicados o devuelve None si no existe"""
+    if filename is None:
+        filename = APP_CONFIG['duplicates_file']
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return DuplicateIndex.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error cargando el índice de duplicados: {str(e)}")
+        return None
+
+def save_duplicates_index(index, filename=None):
+    """Guarda el índice de duplicados de forma atómica"""
+    if filename is None:
+        filename = APP_CONFIG['duplicates_file']
+    if os.path.dirname(filename):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(index.to_dict(), f)
+    os.replace(tmp_filename, filename)
+
+def update_duplicates_index(activities, filename=None):
+    """
+    Actualiza el índice guardado con las actividades sincronizadas
+    Solo se comparan las actividades nuevas o editadas con sus vecinas.
+    Returns:
+        El índice actualizado
+    """
+    index = load_duplicates_index(filename)
+    if index is None:
+        index = DuplicateIndex.from_activities(activities)
+        changed = len(index)
+        current_ids = None
+    else:
+        current_ids = set()
+        changed = 0
+        for activity in sorted(activities, key=lambda activity: activity.get('start_date') or ''):
+            current_ids.add(activity['id'])
+            if index.upsert(activity):
+                changed += 1
+        for activity_id in [activity_id for activity_id in index.ids() if activity_id not in current_ids]:
+            index.remove(activity_id)
+            changed += 1
+
+    logger.info(f"Índice de duplicados actualizado: {changed} actividades modificadas, "
+                f"{len(index.duplicates())} duplicados")
+    if changed or not os.path.exists(filename or APP_CONFIG['duplicates_file']):
+        save_duplicates_index(index, filename)
+    return index
+
+def deduplicate(activities, index=None):
+    """
+    Vista sin duplicados de las actividades
+    Args:
+        activities: Lista de actividades
+        index: DuplicateIndex ya construido (si no, se construye al vuelo)
+    """
+    if index is None:
+        index = DuplicateIndex.from_activities(activities)
+    duplicates = index.duplicates()
+    if not duplicates:
+        return list(activities)
+    return [activity for activity in activities if activity['id'] not in duplicates]
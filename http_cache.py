@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HttpCache:
+    """
+    Caché en disco de respuestas HTTP para revalidar con ETag/If-None-Match
+    Cada URL se guarda en un fichero JSON con su ETag y el cuerpo de la
+    respuesta. La fecha de modificación del fichero se usa como último
+    acceso y, cuando el tamaño total supera max_bytes, se eliminan las
+    entradas menos usadas hasta bajar al 90% del límite.
+    """
+
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(directory)
+            if entry.is_file() and entry.name.endswith('.json')
+        )
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        """Devuelve la entrada guardada ({'etag', 'body', ...}) o None"""
+        path = self._path(url)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrada de caché corrupta para {url}: {str(e)}")
+            return None
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """Guarda una respuesta y aplica la expulsión por tamaño si hace falta"""
+        path = self._path(url)
+        content = json.dumps({
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time(),
+            'body': body
+        })
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+        with self._lock:
+            try:
+                previous_size = os.path.getsize(path)
+            except OSError:
+                previous_size = 0
+            os.replace(tmp_path, path)
+            self._total_bytes += os.path.getsize(path) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Elimina las entradas con acceso más antiguo hasta bajar al 90% del límite"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+                removed += 1
+            except OSError:
+                pass
+        logger.info(f"Caché HTTP: {removed} entradas expulsadas ({self._total_bytes} bytes)")
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
@@ -0,0 +1,276 @@
+import bisect
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from app_settings import APP_CONFIG
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Límites de los histogramas (segundos y bytes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+METRIC_HELP = {
+    'strava_stage_duration_seconds': 'Duración de cada etapa de la sincronización y del dashboard',
+    'strava_http_request_duration_seconds': 'Latencia de las peticiones HTTP a la API de Strava',
+    'strava_http_response_bytes': 'Tamaño de las respuestas HTTP de la API de Strava',
+    'strava_api_calls_total': 'Número de llamadas a la API de Strava',
+    'strava_api_requests_total': 'Peticiones recibidas por la API de consulta',
+    'strava_cache_hits_total': 'Aciertos de caché',
+    'strava_cache_misses_total': 'Fallos de caché',
+    'strava_rate_limit_usage': 'Uso de la cuota de la API de Strava según las cabeceras X-RateLimit',
+    'strava_rate_limit_limit': 'Cuota de la API de Strava según las cabeceras X-RateLimit',
+}
+
+class _Histogram:
+    """Histograma con límites fijos al estilo de Prometheus"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Devuelve pares (límite, recuento acumulado) incluyendo +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+class MetricsRegistry:
+    """Registro de métricas del proceso: contadores, valores e histogramas con etiquetas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Incrementa un contador"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Fija el valor actual de una métrica (gauge)"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def get(self, name, default=None, **labels):
+        """Devuelve el valor actual de una métrica (gauge) o default si no se ha fijado"""
+        key = self._key(name, labels)
+        with self._lock:
+            return self._gauges.get(key, default)
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """Registra una observación en un histograma"""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        """Elimina todas las métricas registradas"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Devuelve las métricas como un diccionario serializable a JSON"""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            gauges = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._gauges.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'buckets': [
+                        {'le': '+Inf' if bound == float('inf') else bound, 'count': count}
+                        for bound, count in histogram.cumulative()
+                    ]
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {'timestamp': time.time(), 'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def to_prometheus(self):
+        """Devuelve las métricas en el formato de texto de Prometheus"""
+        snapshot = self.snapshot()
+        lines = []
+        seen = set()
+
+        def header(name, metric_type):
+            if name not in seen:
+                seen.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        def format_labels(labels):
+            if not labels:
+                return ''
+            parts = ','.join(f'{k}="{v}"' for k, v in labels.items())
+            return '{' + parts + '}'
+
+        for counter in snapshot['counters']:
+            header(counter['name'], 'counter')
+            lines.append(f"{counter['name']}{format_labels(counter['labels'])} {counter['value']}")
+
+        for gauge in snapshot['gauges']:
+            header(gauge['name'], 'gauge')
+            lines.append(f"{gauge['name']}{format_labels(gauge['labels'])} {gauge['value']}")
+
+        for histogram in snapshot['histograms']:
+            name = histogram['name']
+            header(name, 'histogram')
+            for bucket in histogram['buckets']:
+                labels = dict(histogram['labels'], le=bucket['le'])
+                lines.append(f"{name}_bucket{format_labels(labels)} {bucket['count']}")
+            lines.append(f"{name}_sum{format_labels(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{name}_count{format_labels(histogram['labels'])} {histogram['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+# Registro global del proceso
+metrics = MetricsRegistry()
+
+@contextmanager
+def span(stage):
+    """Mide la duración de una etapa y la registra en strava_stage_duration_seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe('strava_stage_duration_seconds', elapsed, stage=stage)
+        logger.info(f"Etapa '{stage}' completada en {elapsed:.3f}s")
+
+def record_http_request(endpoint, status, elapsed, size):
+    """Registra una llamada a la API: latencia, tamaño de respuesta y contador"""
+    metrics.inc('strava_api_calls_total', endpoint=endpoint, status=status)
+    metrics.observe('strava_http_request_duration_seconds', elapsed, endpoint=endpoint)
+    metrics.observe('strava_http_response_bytes', size, buckets=SIZE_BUCKETS, endpoint=endpoint)
+
+def record_rate_limit(headers):
+    """
+    Registra el uso de la cuota que informa Strava en cada respuesta
+    X-RateLimit-Limit y X-RateLimit-Usage llevan "15 minutos,diario"; las
+    cabeceras X-ReadRateLimit-* equivalentes se registran con kind="read".
+    """
+    for prefix, kind in (('X-RateLimit', 'overall'), ('X-ReadRateLimit', 'read')):
+        for suffix, name in (('Usage', 'strava_rate_limit_usage'), ('Limit', 'strava_rate_limit_limit')):
+            value = headers.get(f'{prefix}-{suffix}')
+            if not value:
+                continue
+            try:
+                short, daily = (int(part) for part in value.split(','))
+            except ValueError:
+                continue
+            metrics.set(name, short, kind=kind, window='15min')
+            metrics.set(name, daily, kind=kind, window='daily')
+
+def rate_limit_remaining():
+    """
+    Peticiones que quedan antes de agotar la cuota de Strava
+    Se calcula con las últimas cabeceras registradas por record_rate_limit y
+    devuelve el mínimo entre ambas ventanas y ambas cuotas (general y de lectura).
+    Returns:
+        Número de peticiones restantes, o None si aún no se ha recibido ninguna cabecera
+    """
+    remaining = []
+    for kind in ('overall', 'read'):
+        for window in ('15min', 'daily'):
+            usage = metrics.get('strava_rate_limit_usage', kind=kind, window=window)
+            limit = metrics.get('strava_rate_limit_limit', kind=kind, window=window)
+            if usage is not None and limit is not None:
+                remaining.append(limit - usage)
+    return max(min(remaining), 0) if remaining else None
+
+def record_cache(cache, hit):
+    """Registra un acierto o un fallo de caché"""
+    metrics.inc('strava_cache_hits_total' if hit else 'strava_cache_misses_total', cache=cache)
+
+def _write_atomic(filename, content):
+    """Escribe un fichero de forma atómica para que los lectores nunca vean uno a medias"""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Un temporal por proceso e hilo: las sesiones del dashboard exportan a la vez
+    tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_filename, filename)
+
+def export_metrics(prometheus_file=None, json_file=None):
+    """
+    Exporta las métricas a un fichero de texto de Prometheus y a un fichero JSON
+    Args:
+        prometheus_file: Ruta del fichero .prom (por defecto APP_CONFIG['metrics_file'])
+        json_file: Ruta del fichero JSON (por defecto APP_CONFIG['metrics_json_file'])
+    """
+    try:
+        _write_atomic(prometheus_file or APP_CONFIG['metrics_file'], metrics.to_prometheus())
+        _write_atomic(json_file or APP_CONFIG['metrics_json_file'], json.dumps(metrics.snapshot(), indent=2))
+        return True
+    except Exception as e:
+        logger.error(f"Error exportando métricas: {str(e)}")
+        return False
+
+@contextmanager
+def profile_run(name, enabled=None):
+    """
+    Captura un perfil de cProfile de la ejecución si está activado
+    Args:
+        name: Nombre de la ejecución, usado en el nombre del fichero .prof
+        enabled: Fuerza la activación; por defecto APP_CONFIG['profile_enabled']
+    """
+    if enabled is None:
+        enabled = APP_CONFIG['profile_enabled']
+    if not enabled:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        try:
+            os.makedirs(APP_CONFIG['profile_dir'], exist_ok=True)
+            filename = os.path.join(APP_CONFIG['profile_dir'], f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+            profiler.dump_stats(filename)
+            logger.info(f"Perfil guardado en '{filename}'")
+        except Exception as e:
+            logger.error(f"Error guardando el perfil: {str(e)}")
@@ -0,0 +1,60 @@
+def encode_polyline(points, precision=5):
+    """
+    Codifica una lista de puntos (lat, lng) en el formato de polilínea de Google
+    que usa Strava en map.summary_polyline
+    Args:
+        points: Lista de tuplas (lat, lng)
+        precision: Número de decimales de la codificación
+    """
+    factor = 10 ** precision
+    result = []
+    prev_lat = 0
+    prev_lng = 0
+
+    for lat, lng in points:
+        lat_i = int(round(lat * factor))
+        lng_i = int(round(lng * factor))
+
+        for delta in (lat_i - prev_lat, lng_i - prev_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                result.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            result.append(chr(value + 63))
+
+        prev_lat = lat_i
+        prev_lng = lng_i
+
+    return ''.join(result)
+
+def decode_polyline(encoded, precision=5):
+    """Decodifica una polilínea de Google en una lista de tuplas (lat, lng)"""
+    if not encoded:
+        return []
+
+    factor = 10 ** precision
+    points = []
+    index = 0
+    lat = 0
+    lng = 0
+    length = len(encoded)
+
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = 0
+            value = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                value |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(value >> 1) if value & 1 else value >> 1)
+
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+
+    return points
@@ -0,0 +1,222 @@
+import bisect
+import heapq
+import json
+import logging
+import os
+from app_settings import APP_CONFIG
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Métricas indexadas (campos de la actividad en unidades de la API)
+RECORD_METRICS = ('distance', 'total_elevation_gain', 'moving_time', 'average_speed')
+# Clave de año para los récords absolutos
+ALL_YEARS = 'all'
+
+class RecordsIndex:
+    """
+    Índice de récords personales por métrica, tipo de actividad y año
+    Cada clave (métrica, tipo, año) guarda una lista ordenada de pares
+    (-valor, id), de modo que la posición de una actividad se localiza con
+    búsqueda binaria en O(log n) al añadirla, editarla o eliminarla, y el
+    top-N o las actividades por encima de un umbral son un simple slice.
+    Insertar o borrar en la lista desplaza los elementos siguientes, así que
+    cada alta cuesta O(n) en el peor caso (un memmove, rápido con decenas de
+    miles de actividades); lo que se evita es reordenar o recorrer todo.
+    """
+
+    def __init__(self):
+        self._lists = {}
+        self._entries = {}
+
+    @staticmethod
+    def _entry(activity):
+        """Extrae del activity los datos que se indexan"""
+        start = activity.get('start_date_local') or activity.get('start_date') or ''
+        values = {}
+        for metric in RECORD_METRICS:
+            value = activity.get(metric)
+            if value is not None:
+                values[metric] = float(value)
+        return {
+            'type': activity.get('type'),
+            'year': int(start[:4]) if start[:4].isdigit() else None,
+            'values': values
+        }
+
+    @staticmethod
+    def _keys(entry, metric):
+        keys = [(metric, entry['type'], ALL_YEARS)]
+        if entry['year'] is not None:
+            keys.append((metric, entry['type'], entry['year']))
+        return keys
+
+    def _insert(self, activity_id, entry):
+        for metric, value in entry['values'].items():
+            for key in self._keys(entry, metric):
+                bisect.insort(self._lists.setdefault(key, []), (-value, activity_id))
+        self._entries[activity_id] = entry
+
+    def _delete(self, activity_id):
+        entry = self._entries.pop(activity_id, None)
+        if entry is None:
+            return
+        for metric, value in entry['values'].items():
+            for key in self._keys(entry, metric):
+                items = self._lists[key]
+                position = bisect.bisect_left(items, (-value, activity_id))
+                if position < len(items) and items[position] == (-value, activity_id):
+                    del items[position]
+
+    def upsert(self, activity):
+        """
+        Añade o actualiza una actividad
+        Returns:
+            True si el índice ha cambiado
+        """
+        activity_id = activity['id']
+        entry = self._entry(activity)
+        if self._entries.get(activity_id) == entry:
+            return False
+        self._delete(activity_id)
+        self._insert(activity_id, entry)
+        return True
+
+    def remove(self, activity_id):
+        """Elimina una actividad del índice"""
+        self._delete(activity_id)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, activity_id):
+        return activity_id in self._entries
+
+    def ids(self):
+        """Ids de las actividades indexadas"""
+        return list(self._entries)
+
+    def types(self):
+        """Tipos de actividad presentes en el índice"""
+        return sorted({activity_type for _, activity_type, _ in self._lists if activity_type})
+
+    def _iter_sorted(self, metric, activity_type, years=None):
+        """Recorre (id, valor) de mayor a menor, combinando las listas de varios años"""
+        if years is None:
+            sources = [self._lists.get((metric, activity_type, ALL_YEARS), [])]
+        else:
+            sources = [self._lists.get((metric, activity_type, int(year)), []) for year in years]
+        if not sources:
+            return
+        iterator = sources[0] if len(sources) == 1 else heapq.merge(*sources)
+        for negative_value, activity_id in iterator:
+            yield activity_id, -negative_value
+
+    def top(self, metric, activity_type, years=None, n=10, allowed_ids=None):
+        """
+        Devuelve las n mejores actividades como lista de (id, valor)
+        Args:
+            metric: Una de RECORD_METRICS
+            activity_type: Tipo de actividad ('Ride', 'Run'...)
+            years: Lista de años o None para los récords absolutos
+            n: Número de récords
+            allowed_ids: Conjunto opcional de ids admitidos (p. ej. filtro por mes)
+        """
+        result = []
+        for activity_id, value in self._iter_sorted(metric, activity_type, years):
+            if allowed_ids is not None and activity_id not in allowed_ids:
+                continue
+            result.append((activity_id, value))
+            if len(result) >= n:
+                break
+        return result
+
+    def at_least(self, metric, activity_type, threshold, years=None):
+        """Devuelve (id, valor) de las actividades con valor >= threshold, de mayor a menor"""
+        if years is None or len(years) == 1:
+            key = (metric, activity_type, ALL_YEARS if years is None else int(years[0]))
+            items = self._lists.get(key, [])
+            end = bisect.bisect_right(items, (-threshold, float('inf')))
+            return [(activity_id, -negative_value) for negative_value, activity_id in items[:end]]
+
+        result = []
+        for activity_id, value in self._iter_sorted(metric, activity_type, years):
+            if value < threshold:
+                break
+            result.append((activity_id, value))
+        return result
+
+    def to_dict(self):
+        """Serializa el índice; las listas se guardan ya ordenadas para no reordenar al cargar"""
+        return {
+            'entries': {str(activity_id): entry for activity_id, entry in self._entries.items()},
+            'lists': [
+                {'metric': metric, 'type': activity_type, 'year': year, 'items': items}
+                for (metric, activity_type, year), items in self._lists.items() if items
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        index._entries = {int(activity_id): entry for activity_id, entry in data['entries'].items()}
+        for item in data['lists']:
+            key = (item['metric'], item['type'], item['year'])
+            index._lists[key] = [(value, activity_id) for value, activity_id in item['items']]
+        return index
+
+    @classmethod
+    def from_activities(cls, activities):
+        index = cls()
+        for activity in activities:
+            index.upsert(activity)
+        return index
+
+def load_records_index(filename=None):
+    """Carga el índice de récords o devuelve None si no existe"""
+    if filename is None:
+        filename = APP_CONFIG['records_file']
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return RecordsIndex.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error cargando el índice de récords: {str(e)}")
+        return None
+
+def save_records_index(index, filename=None):
+    """Guarda el índice de récords de forma atómica"""
+    if filename is None:
+        filename = APP_CONFIG['records_file']
+    if os.path.dirname(filename):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(index.to_dict(), f)
+    os.replace(tmp_filename, filename)
+
+def update_records_index(activities, filename=None):
+    """
+    Actualiza el índice guardado con las actividades sincronizadas
+    Solo se reindexan las actividades nuevas, editadas o eliminadas, pero el
+    índice se lee y se reescribe entero (O(n)) en cada sincronización con cambios.
+    Returns:
+        El índice actualizado
+    """
+    index = load_records_index(filename) or RecordsIndex()
+    current_ids = set()
+    changed = 0
+    for activity in activities:
+        current_ids.add(activity['id'])
+        if index.upsert(activity):
+            changed += 1
+    for activity_id in [activity_id for activity_id in index.ids() if activity_id not in current_ids]:
+        index.remove(activity_id)
+        changed += 1
+
+    logger.info(f"Índice de récords actualizado: {changed} actividades modificadas")
+    if changed or not os.path.exists(filename or APP_CONFIG['records_file']):
+        save_records_index(index, filename)
+    return index
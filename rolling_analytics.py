@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# Métricas acumuladas (columnas de prepare_data)
+DAILY_METRICS = ('distance_km', 'moving_time_hours', 'total_elevation_gain')
+
+class DailyCumulative:
+    """
+    Sumas acumuladas diarias por tipo de actividad
+    Guarda un array denso cum[tipo, día, métrica] donde cum[:, k] es el total
+    de los días anteriores a k. El total de cualquier ventana es la diferencia
+    de dos posiciones, O(1), y las curvas completas se obtienen con una sola
+    operación vectorizada sobre el array.
+    """
+
+    def __init__(self, df, end_date=None):
+        """
+        Args:
+            df: DataFrame preparado con prepare_data
+            end_date: Último día incluido (por defecto, el mayor entre hoy y la última actividad);
+                las actividades posteriores se descartan
+        Raises:
+            ValueError: Si no queda ninguna actividad hasta end_date
+        """
+        dates = df['start_date_local']
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        days = dates.dt.normalize()
+
+        if end_date is None:
+            end_date = max(days.max(), pd.Timestamp.today().normalize())
+        self.end_date = pd.Timestamp(end_date).normalize()
+        # Las actividades posteriores a end_date quedarían fuera del array
+        in_range = (days <= self.end_date).to_numpy()
+        if not in_range.all():
+            df = df[in_range]
+            days = days[in_range]
+        if df.empty:
+            raise ValueError(f"No hay actividades hasta {self.end_date.date()}")
+
+        self.origin = days.min()
+        self.n_days = (self.end_date - self.origin).days + 1
+
+        self.types = sorted(df['type'].unique())
+        self._type_positions = {activity_type: i for i, activity_type in enumerate(self.types)}
+        type_idx = df['type'].map(self._type_positions).to_numpy()
+        day_idx = ((days - self.origin) // pd.Timedelta(days=1)).to_numpy()
+
+        # Totales diarios con bincount sobre el índice plano (tipo, día)
+        flat_idx = type_idx * self.n_days + day_idx
+        size = len(self.types) * self.n_days
+        daily = np.empty((len(self.types), self.n_days, len(DAILY_METRICS)))
+        for m, metric in enumerate(DAILY_METRICS):
+            values = df[metric].fillna(0).to_numpy(dtype=float)
+            daily[:, :, m] = np.bincount(flat_idx, weights=values, minlength=size).reshape(len(self.types), self.n_days)
+
+        self.cum = np.zeros((len(self.types), self.n_days + 1, len(DAILY_METRICS)))
+        np.cumsum(daily, axis=1, out=self.cum[:, 1:])
+        self.dates = pd.date_range(self.origin, self.end_date, freq='D')
+
+    def _series(self, metric, types=None):
+        """Suma acumulada de una métrica para los tipos indicados (todos si es None)"""
+        m = DAILY_METRICS.index(metric)
+        if types is None:
+            return self.cum[:, :, m].sum(axis=0)
+        positions = [self._type_positions[t] for t in types if t in self._type_positions]
+        if not positions:
+            return np.zeros(self.n_days + 1)
+        return self.cum[positions, :, m].sum(axis=0)
+
+    def _day_index(self, date):
+        return (pd.Timestamp(date).normalize() - self.origin).days
+
+    def window_total(self, date, days, metric, types=None):
+        """Total de los `days` días que terminan en `date` (incluido)"""
+        m = DAILY_METRICS.index(metric)
+        # El inicio se calcula antes de recortar el final: una ventana posterior
+        # a end_date no debe desplazarse hacia los últimos días con datos
+        end = self._day_index(date) + 1
+        start = int(np.clip(end - days, 0, self.n_days))
+        end = int(np.clip(end, 0, self.n_days))
+        if types is None:
+            positions = slice(None)
+        else:
+            positions = [self._type_positions[t] for t in types if t in self._type_positions]
+        return float((self.cum[positions, end, m] - self.cum[positions, start, m]).sum())
+
+    def rolling(self, days, metric, types=None):
+        """Curva completa del total móvil de `days` días para cada fecha"""
+        cum = self._series(metric, types)
+        ends = np.arange(1, self.n_days + 1)
+        values = cum[ends] - cum[np.maximum(ends - days, 0)]
+        return pd.Series(values, index=self.dates, name=metric)
+
+    def year_over_year(self, metric, years, types=None):
+        """
+        Progreso acumulado desde el 1 de enero de cada año
+        Returns:
+            DataFrame con el día del año (1-366) como índice y una columna por año
+        """
+        cum = self._series(metric, types)
+        years = sorted(int(year) for year in years)
+        if not years:
+            return pd.DataFrame(index=pd.RangeIndex(1, 367, name='day_of_year'))
+
+        starts = np.array([(pd.Timestamp(year=year, month=1, day=1) - self.origin).days for year in years])
+        offsets = np.arange(366)
+        # Índices [año, día] en el array acumulado, en una única operación
+        idx = np.clip(starts[:, None] + offsets[None, :] + 1, 0, self.n_days)
+        base = cum[np.clip(starts, 0, self.n_days)]
+        values = cum[idx] - base[:, None]
+
+        # Sin datos tras el 31 de diciembre de años no bisiestos ni después de end_date
+        year_lengths = np.array([366 if pd.Timestamp(year=year, month=12, day=31).dayofyear == 366 else 365
+                                 for year in years])
+        beyond = (offsets[None, :] >= year_lengths[:, None]) | (starts[:, None] + offsets[None, :] >= self.n_days)
+        values[beyond] = np.nan
+
+        return pd.DataFrame(values.T, index=pd.RangeIndex(1, 367, name='day_of_year'), columns=years)
@@ -0,0 +1,336 @@
+import functools
+import hashlib
+import json
+import logging
+import math
+import os
+import numpy as np
+from app_settings import APP_CONFIG
+from polyline_codec import decode_polyline
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Metros por grado de latitud
+METERS_PER_DEGREE = 111320.0
+# Puntos a los que se remuestrea cada recorrido antes de compararlo
+RESAMPLE_POINTS = 24
+# Distancia de Fréchet máxima (metros) para considerar que dos recorridos son la misma ruta
+MATCH_THRESHOLD_M = 250.0
+# Lado de las celdas de la rejilla de inicio/fin; debe ser >= MATCH_THRESHOLD_M
+GRID_SIZE_M = 500.0
+CELL_DEGREES = GRID_SIZE_M / METERS_PER_DEGREE
+
+def _cell(lat, lng):
+    return int(math.floor(lat / CELL_DEGREES)), int(math.floor(lng / CELL_DEGREES))
+
+def _neighbour_cells(lat, lng):
+    """
+    Celdas que pueden contener un punto a menos de MATCH_THRESHOLD_M de (lat, lng)
+    Las celdas miden lo mismo en grados, así que en longitud hacen falta más
+    vecinas cuanto más lejos del ecuador.
+    """
+    cell_lat, cell_lng = _cell(lat, lng)
+    lng_radius = math.ceil(MATCH_THRESHOLD_M / (GRID_SIZE_M * max(math.cos(math.radians(lat)), 0.01)))
+    return {
+        (cell_lat + d_lat, cell_lng + d_lng)
+        for d_lat in (-1, 0, 1)
+        for d_lng in range(-lng_radius, lng_radius + 1)
+    }
+
+def _to_meters(points, origin):
+    """Proyección equirectangular local alrededor de origin (lat, lng) -> (norte, este) en metros"""
+    scale = np.array([METERS_PER_DEGREE, METERS_PER_DEGREE * math.cos(math.radians(origin[0]))])
+    return (points - np.asarray(origin)) * scale
+
+def resample(points, n=RESAMPLE_POINTS):
+    """Remuestrea un recorrido (array de lat, lng) a n puntos equiespaciados a lo largo del camino"""
+    meters = _to_meters(points, points[0])
+    steps = np.hypot(*np.diff(meters, axis=0).T)
+    distance = np.concatenate(([0.0], np.cumsum(steps)))
+    if distance[-1] == 0:
+        return np.repeat(points[:1], n, axis=0)
+    targets = np.linspace(0.0, distance[-1], n)
+    return np.column_stack((
+        np.interp(targets, distance, points[:, 0]),
+        np.interp(targets, distance, points[:, 1])
+    ))
+
+@functools.lru_cache(maxsize=8)
+def _skew_indices(n, m):
+    """
+    Índices planos de la matriz (n, m) ordenados por antidiagonal
+    La fila d contiene las celdas (i, d - i) para i en [0, n); las que caen
+    fuera de la matriz apuntan a la posición n * m, que vale infinito.
+    """
+    diagonals = np.arange(n + m - 1)[:, None]
+    rows = np.arange(n)[None, :]
+    columns = diagonals - rows
+    valid = (columns >= 0) & (columns < m)
+    return np.where(valid, rows * m + columns, n * m)
+
+def discrete_frechet(query, candidates):
+    """
+    Distancia de Fréchet discreta entre un recorrido y varios candidatos a la vez
+    La programación dinámica se recorre por antidiagonales: las celdas de una
+    misma antidiagonal solo dependen de las dos anteriores, así que cada paso
+    se calcula con numpy para todas las celdas y todos los candidatos.
+    Args:
+        query: Array (n, 2) en metros
+        candidates: Array (k, m, 2) en metros
+    Returns:
+        Array (k,) con la distancia de cada candidato
+    """
+    n = query.shape[0]
+    k, m = candidates.shape[:2]
+    distances = np.linalg.norm(query[None, :, None, :] - candidates[:, None, :, :], axis=-1)
+    distances = np.concatenate((distances.reshape(k, n * m), np.full((k, 1), np.inf)), axis=1)
+    skewed = distances[:, _skew_indices(n, m)]
+
+    # Fila d + 2 de la tabla = antidiagonal d, indexada por i con una columna
+    # inicial para i = -1; el 0 de la fila 0 arranca la celda (0, 0)
+    table = np.full((k, n + m + 1, n + 1), np.inf)
+    table[:, 0, 0] = 0.0
+    for diagonal in range(n + m - 1):
+        previous = table[:, diagonal + 1]
+        best_previous = np.minimum(np.minimum(previous[:, 1:], previous[:, :-1]), table[:, diagonal, :-1])
+        np.maximum(skewed[:, diagonal], best_previous, out=table[:, diagonal + 2, 1:])
+    return table[:, n + m, n]
+
+def route_signature(activity):
+    """
+    Firma geométrica de una actividad a partir de su summary_polyline
+    Returns:
+        Diccionario con los puntos remuestreados, caja envolvente y celdas de
+        inicio y fin, o None si la actividad no tiene recorrido
+    """
+    polyline = (activity.get('map') or {}).get('summary_polyline')
+    if not polyline:
+        return None
+    points = np.array(decode_polyline(polyline), dtype=float)
+    if len(points) < 2:
+        return None
+    if activity.get('start_latlng'):
+        points[0] = activity['start_latlng']
+    points = resample(points)
+    return {
+        'points': np.round(points, 6),
+        'bbox': [float(value) for value in (*points.min(axis=0), *points.max(axis=0))],
+        'start_cell': _cell(*points[0]),
+        'end_cell': _cell(*points[-1]),
+    }
+
+def _polyline_key(activity):
+    polyline = (activity.get('map') or {}).get('summary_polyline') or ''
+    return hashlib.sha1(polyline.encode('utf-8')).hexdigest()[:16] if polyline else None
+
+class RouteIndex:
+    """
+    Agrupación de actividades en rutas repetidas
+    Cada ruta se representa por el recorrido de su primera actividad (líder).
+    Una actividad nueva solo se compara con las rutas cuyo inicio y fin caen
+    en celdas vecinas de la rejilla y cuya caja envolvente coincide con la
+    suya salvo MATCH_THRESHOLD_M; ambos filtros son exactos para la distancia
+    de Fréchet, así que no descartan ninguna ruta válida. Los candidatos que
+    quedan se confirman juntos con discrete_frechet y la actividad se asigna
+    a la ruta más parecida o crea una nueva. El sentido del recorrido cuenta:
+    un bucle hecho al revés es otra ruta.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._assignments = {}
+        self._by_start_cell = {}
+        self._points = {}
+        self._next_id = 1
+
+    def _add_route(self, route_id, route):
+        self._routes[route_id] = route
+        self._points[route_id] = np.array(route['points'])
+        self._by_start_cell.setdefault(tuple(route['start_cell']), []).append(route_id)
+
+    def _delete_route(self, route_id):
+        route = self._routes.pop(route_id)
+        del self._points[route_id]
+        bucket = self._by_start_cell[tuple(route['start_cell'])]
+        bucket.remove(route_id)
+        if not bucket:
+            del self._by_start_cell[tuple(route['start_cell'])]
+
+    def _candidates(self, signature):
+        """Rutas que pasan los filtros de rejilla y caja envolvente"""
+        start, end = signature['points'][0], signature['points'][-1]
+        end_cells = _neighbour_cells(*end)
+        lat_tolerance = MATCH_THRESHOLD_M / METERS_PER_DEGREE
+        lng_tolerance = lat_tolerance / max(math.cos(math.radians(start[0])), 0.01)
+        tolerance = (lat_tolerance, lng_tolerance, lat_tolerance, lng_tolerance)
+        candidates = []
+        for cell in _neighbour_cells(*start):
+            for route_id in self._by_start_cell.get(cell, ()):
+                route = self._routes[route_id]
+                if tuple(route['end_cell']) not in end_cells:
+                    continue
+                if all(abs(a - b) <= t for a, b, t in zip(route['bbox'], signature['bbox'], tolerance)):
+                    candidates.append(route_id)
+        return candidates
+
+    def match(self, signature):
+        """
+        Busca la ruta más parecida a una firma
+        Returns:
+            Tupla (id de ruta, distancia de Fréchet en metros) o (None, None)
+        """
+        candidates = self._candidates(signature)
+        if not candidates:
+            return None, None
+        origin = signature['points'][0]
+        query = _to_meters(signature['points'], origin)
+        others = _to_meters(np.stack([self._points[route_id] for route_id in candidates]), origin)
+        distances = discrete_frechet(query, others)
+        best = int(np.argmin(distances))
+        if distances[best] > MATCH_THRESHOLD_M:
+            return None, None
+        return candidates[best], float(distances[best])
+
+    def _unassign(self, activity_id):
+        assignment = self._assignments.pop(activity_id, None)
+        if assignment is None:
+            return
+        route = self._routes[assignment[0]]
+        route['count'] -= 1
+        if route['count'] == 0:
+            self._delete_route(assignment[0])
+
+    def upsert(self, activity):
+        """
+        Asigna una actividad nueva o con el recorrido editado a su ruta
+        Returns:
+            True si el índice ha cambiado
+        """
+        activity_id = activity['id']
+        key = _polyline_key(activity)
+        current = self._assignments.get(activity_id)
+        if (current[1] if current else None) == key:
+            return False
+        self._unassign(activity_id)
+        signature = route_signature(activity) if key else None
+        if signature is None:
+            return current is not None
+
+        route_id, _ = self.match(signature)
+        if route_id is None:
+            route_id = self._next_id
+            self._next_id += 1
+            self._add_route(route_id, {
+                'leader': activity_id,
+                'points': signature['points'].tolist(),
+                'bbox': signature['bbox'],
+                'start_cell': list(signature['start_cell']),
+                'end_cell': list(signature['end_cell']),
+                'distance': float(activity.get('distance') or 0),
+                'count': 0
+            })
+        self._routes[route_id]['count'] += 1
+        self._assignments[activity_id] = [route_id, key]
+        return True
+
+    def remove(self, activity_id):
+        """Elimina una actividad del índice"""
+        self._unassign(activity_id)
+
+    def __len__(self):
+        return len(self._assignments)
+
+    def ids(self):
+        """Ids de las actividades asignadas a alguna ruta"""
+        return list(self._assignments)
+
+    def route_of(self, activity_id):
+        """Id de la ruta de una actividad o None"""
+        assignment = self._assignments.get(activity_id)
+        return assignment[0] if assignment else None
+
+    def assignments(self):
+        """Devuelve {id de actividad: id de ruta}"""
+        return {activity_id: assignment[0] for activity_id, assignment in self._assignments.items()}
+
+    def routes(self, min_count=1):
+        """Rutas con al menos min_count actividades, de más a menos repetida"""
+        result = [
+            {'id': route_id, 'leader': route['leader'], 'distance': route['distance'], 'count': route['count']}
+            for route_id, route in self._routes.items() if route['count'] >= min_count
+        ]
+        return sorted(result, key=lambda route: (-route['count'], route['id']))
+
+    def to_dict(self):
+        return {
+            'routes': {str(route_id): route for route_id, route in self._routes.items()},
+            'assignments': {str(activity_id): assignment for activity_id, assignment in self._assignments.items()},
+            'next_id': self._next_id
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        for route_id, route in data['routes'].items():
+            index._add_route(int(route_id), route)
+        index._assignments = {int(activity_id): assignment for activity_id, assignment in data['assignments'].items()}
+        index._next_id = data['next_id']
+        return index
+
+    @classmethod
+    def from_activities(cls, activities):
+        """Construye el índice en orden cronológico, de modo que cada ruta la lidera su primera actividad"""
+        index = cls()
+        for activity in sorted(activities, key=lambda activity: activity.get('start_date') or ''):
+            index.upsert(activity)
+        return index
+
+def load_route_index(filename=None):
+    """Carga el índice de rutas o devuelve None si no existe"""
+    if filename is None:
+        filename = APP_CONFIG['routes_file']
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return RouteIndex.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error cargando el índice de rutas: {str(e)}")
+        return None
+
+def save_route_index(index, filename=None):
+    """Guarda el índice de rutas de forma atómica"""
+    if filename is None:
+        filename = APP_CONFIG['routes_file']
+    if os.path.dirname(filename):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(index.to_dict(), f)
+    os.replace(tmp_filename, filename)
+
+def update_route_index(activities, filename=None):
+    """
+    Actualiza el índice guardado con las actividades sincronizadas
+    Solo se emparejan las actividades nuevas o con el recorrido editado.
+    Returns:
+        El índice actualizado
+    """
+    index = load_route_index(filename) or RouteIndex()
+    current_ids = set()
+    changed = 0
+    for activity in sorted(activities, key=lambda activity: activity.get('start_date') or ''):
+        current_ids.add(activity['id'])
+        if index.upsert(activity):
+            changed += 1
+    for activity_id in [activity_id for activity_id in index.ids() if activity_id not in current_ids]:
+        index.remove(activity_id)
+        changed += 1
+
+    logger.info(f"Índice de rutas actualizado: {changed} actividades modificadas, "
+                f"{len(index.routes(min_count=2))} rutas repetidas")
+    if changed or not os.path.exists(filename or APP_CONFIG['routes_file']):
+        save_route_index(index, filename)
+    return index
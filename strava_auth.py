@@ -7,6 +7,7 @@ import threading
 import webbrowser
 from flask import Flask, request
 from config import STRAVA_CONFIG, APP_CONFIG
+from instrumentation import span, record_http_request
 import streamlit as st
 import uuid
 from urllib.parse import parse_qs, urlparse
@@ -138,15 +139,19 @@ def refresh_tokens(refresh_token):
     """Renueva los tokens usando el refresh token"""
     try:
         logger.info("Renovando tokens...")
-        response = requests.post(
-            STRAVA_CONFIG['token_url'],
-            data={
-                'client_id': STRAVA_CONFIG['client_id'],
-                'client_secret': STRAVA_CONFIG['client_secret'],
-                'refresh_token': refresh_token,
-                'grant_type': 'refresh_token'
-            }
-        )
+        with span('refresh_tokens'):
+            start = time.perf_counter()
+            response = requests.post(
+                STRAVA_CONFIG['token_url'],
+                data={
+                    'client_id': STRAVA_CONFIG['client_id'],
+                    'client_secret': STRAVA_CONFIG['client_secret'],
+                    'refresh_token': refresh_token,
+                    'grant_type': 'refresh_token'
+                }
+            )
+            record_http_request('oauth_token', response.status_code,
+                                time.perf_counter() - start, len(response.content))
         
         if response.status_code != 200:
             logger.error(f"Error en la respuesta de Strava: {response.status_code}")
@@ -157,7 +162,8 @@ def refresh_tokens(refresh_token):
         tokens['expires_at'] = time.time() + tokens['expires_in']
         
         # Asegurarse de que el directorio existe
-        os.makedirs(os.path.dirname(APP_CONFIG['tokens_file']), exist_ok=True)
+        if os.path.dirname(APP_CONFIG['tokens_file']):
+            os.makedirs(os.path.dirname(APP_CONFIG['tokens_file']), exist_ok=True)
         
         with open(APP_CONFIG['tokens_file'], 'w') as f:
             json.dump(tokens, f)
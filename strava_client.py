@@ -1,6 +1,9 @@
+import json
 import requests
 import logging
+import time
 from config import STRAVA_CONFIG
+from instrumentation import record_http_request, record_cache, record_rate_limit
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -30,7 +33,11 @@ class StravaClient:
                     'page': page
                 }
                 
+                start = time.perf_counter()
                 response = requests.get(url, headers=self.headers, params=params)
+                record_http_request('athlete_activities', response.status_code,
+                                    time.perf_counter() - start, len(response.content))
+                record_rate_limit(response.headers)
                 response.raise_for_status()
                 
                 activities = response.json()
@@ -55,4 +62,34 @@ class StravaClient:
             return None
         except Exception as e:
             logger.error(f"Error inesperado: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    def get_activity(self, activity_id, cache=None):
+        """
+        Obtiene el detalle de una actividad (incluye description y calories)
+        Si se pasa una HttpCache, la petición se revalida con If-None-Match y
+        una respuesta 304 se sirve desde la caché sin volver a descargarla.
+        Lanza requests.exceptions.HTTPError si la respuesta es un error.
+        """
+        url = f"{self.base_url}/activities/{activity_id}"
+        headers = dict(self.headers)
+        cached = cache.get(url) if cache is not None else None
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+
+        start = time.perf_counter()
+        response = requests.get(url, headers=headers)
+        record_http_request('activity_detail', response.status_code,
+                            time.perf_counter() - start, len(response.content))
+        record_rate_limit(response.headers)
+
+        if response.status_code == 304 and cached:
+            record_cache('http', True)
+            return json.loads(cached['body'])
+
+        response.raise_for_status()
+        if cache is not None:
+            record_cache('http', False)
+            cache.put(url, response.text, etag=response.headers.get('ETag'),
+                      last_modified=response.headers.get('Last-Modified'))
+        return response.json()
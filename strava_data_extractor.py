@@ -4,6 +4,11 @@ import logging
 from strava_client import StravaClient
 from strava_auth import get_strava_tokens
 from config import STRAVA_CONFIG, APP_CONFIG
+from instrumentation import span, export_metrics, profile_run
+from records_index import update_records_index
+from deduplication import deduplicate, update_duplicates_index
+from route_matching import update_route_index
+from activity_enrichment import enrich_activities
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -22,7 +27,8 @@ def save_activities(activities, filename=None, silent=False):
             filename = APP_CONFIG['data_file']
             
         # Asegurarse de que el directorio existe
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        if os.path.dirname(filename):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
         
         # Guardar las actividades
         with open(filename, 'w', encoding='utf-8') as f:
@@ -42,14 +48,74 @@ def save_activities(activities, filename=None, silent=False):
             print(error_msg)
         return False
 
+def load_stored_activities(filename=None):
+    """Carga las actividades guardadas o devuelve una lista vacía si no existen"""
+    if filename is None:
+        filename = APP_CONFIG['data_file']
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.error(f"Error cargando actividades guardadas: {str(e)}")
+        return []
+
+def _is_empty(value):
+    return value is None or value == '' or value == [] or value == {}
+
+def merge_activities(existing, incoming, overwrite=False, keep_missing=True):
+    """
+    Combina dos listas de actividades por 'id'
+    Args:
+        existing: Actividades ya guardadas
+        incoming: Actividades nuevas (API, exportación masiva, detalle...)
+        overwrite: Si es True, los valores no vacíos de incoming sustituyen a los
+            existentes; si es False solo rellenan los campos vacíos
+        keep_missing: Si es False, solo se conservan las actividades de incoming
+            (las guardadas solo aportan los campos que faltan)
+    Returns:
+        Lista combinada, ordenada de más reciente a más antigua como la API
+    """
+    incoming = list(incoming)
+    if not keep_missing:
+        incoming_ids = {activity['id'] for activity in incoming}
+        existing = [activity for activity in existing if activity['id'] in incoming_ids]
+    merged = {activity['id']: dict(activity) for activity in existing}
+    for activity in incoming:
+        current = merged.get(activity['id'])
+        if current is None:
+            merged[activity['id']] = dict(activity)
+            continue
+        for key, value in activity.items():
+            if _is_empty(value):
+                continue
+            if overwrite or _is_empty(current.get(key)):
+                current[key] = value
+    return sorted(
+        merged.values(),
+        key=lambda activity: activity.get('start_date') or '',
+        reverse=True
+    )
+
 def actualizar_datos(silent=False):
     """Actualiza los datos de actividades de Strava"""
+    with profile_run('actualizar_datos'):
+        try:
+            with span('actualizar_datos'):
+                return _actualizar_datos(silent)
+        finally:
+            export_metrics()
+
+def _actualizar_datos(silent):
+    """Etapas de la actualización, cada una medida con su propio span"""
     try:
         logger.info("Iniciando actualización de datos...")
         
         # Obtener tokens
         logger.info("Obteniendo tokens de Strava...")
-        tokens = get_strava_tokens()
+        with span('get_strava_tokens'):
+            tokens = get_strava_tokens()
         if not tokens:
             error_msg = "No se pudieron obtener los tokens de Strava"
             logger.error(error_msg)
@@ -61,7 +127,8 @@ def actualizar_datos(silent=False):
         
         # Obtener actividades
         logger.info("Obteniendo actividades de Strava...")
-        activities = client.get_activities()
+        with span('get_activities'):
+            activities = client.get_activities()
         if not activities:
             error_msg = "No se pudieron obtener las actividades"
             logger.error(error_msg)
@@ -69,9 +136,30 @@ def actualizar_datos(silent=False):
         
         logger.info(f"Se obtuvieron {len(activities)} actividades")
         
+        # La API devuelve la lista completa: las actividades borradas o privadas
+        # desaparecen y las guardadas solo rellenan los campos que faltan
+        # (streams importados, polilínea, description, calories...)
+        with span('merge_activities'):
+            activities = merge_activities(load_stored_activities(), activities, overwrite=True, keep_missing=False)
+        
+        # Completar description, calories... de las actividades que aún no los tienen
+        logger.info("Enriqueciendo actividades con su detalle...")
+        with span('enrich_activities'):
+            enrich_activities(client, activities, max_requests=APP_CONFIG['enrichment_max_requests'],
+                              revalidate_recent=APP_CONFIG['enrichment_revalidate_recent'])
+        
         # Guardar actividades en archivo JSON
         logger.info("Guardando actividades en archivo JSON...")
-        if save_activities(activities, silent=silent):
+        with span('save_activities'):
+            saved = save_activities(activities, silent=silent)
+        if saved:
+            # Récords y rutas se calculan sobre la vista sin grabaciones duplicadas
+            with span('update_duplicates_index'):
+                unique_activities = deduplicate(activities, update_duplicates_index(activities))
+            with span('update_records_index'):
+                update_records_index(unique_activities)
+            with span('update_route_index'):
+                update_route_index(unique_activities)
             logger.info("Actualización completada exitosamente")
             return {'success': True, 'activities': len(activities)}
         else:
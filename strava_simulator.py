@@ -0,0 +1,340 @@
+import argparse
+import bisect
+import hashlib
+import logging
+import math
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import Flask, Response, g, jsonify, request
+from polyline_codec import decode_polyline
+from synthetic_activities import generate_activities
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Límites por defecto de una aplicación de Strava: (cada 15 minutos, diario)
+DEFAULT_RATE_LIMIT = (200, 2000)
+DEFAULT_READ_RATE_LIMIT = (100, 1000)
+TOKEN_LIFETIME = 6 * 3600
+MAX_PER_PAGE = 200
+STREAM_TYPES = ('latlng', 'distance', 'time', 'altitude')
+
+class RateLimiter:
+    """
+    Contadores de uso con ventanas fijas como los de Strava
+    La ventana corta empieza en múltiplos de short_window segundos (cada
+    cuarto de hora en punto) y la larga en múltiplos de long_window (cada
+    día a medianoche UTC).
+    """
+
+    def __init__(self, limits, short_window=900, long_window=86400):
+        self.limits = limits
+        self.short_window = short_window
+        self.long_window = long_window
+        self._lock = threading.Lock()
+        self._windows = [None, None]
+        self._usage = [0, 0]
+
+    def _roll(self, now):
+        for position, length in enumerate((self.short_window, self.long_window)):
+            window = int(now // length)
+            if window != self._windows[position]:
+                self._windows[position] = window
+                self._usage[position] = 0
+
+    def acquire(self, now=None):
+        """
+        Cuenta una petición si cabe en ambas ventanas
+        Returns:
+            Tupla (permitida, uso tras la petición)
+        """
+        with self._lock:
+            self._roll(time.time() if now is None else now)
+            allowed = all(usage < limit for usage, limit in zip(self._usage, self.limits))
+            if allowed:
+                self._usage = [usage + 1 for usage in self._usage]
+            return allowed, tuple(self._usage)
+
+    def usage(self):
+        with self._lock:
+            self._roll(time.time())
+            return tuple(self._usage)
+
+class SimulatorState:
+    """Datos y comportamiento configurables del simulador"""
+
+    def __init__(self, activities=None, size=1000, seed=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 rate_limit=DEFAULT_RATE_LIMIT, read_rate_limit=DEFAULT_READ_RATE_LIMIT,
+                 short_window=900, long_window=86400):
+        """
+        Args:
+            activities: Actividades a servir (por defecto se generan size sintéticas)
+            size: Número de actividades sintéticas
+            seed: Semilla del generador sintético y de la inyección de errores
+            latency_ms: Latencia añadida a cada petición de la API
+            jitter_ms: Variación aleatoria (uniforme, +/-) de la latencia
+            error_rate: Fracción de peticiones que responden 500 o 503
+            rate_limit: Límite total (15 minutos, diario); None para no limitar
+            read_rate_limit: Límite de lectura (15 minutos, diario); None para no limitar
+            short_window, long_window: Duración de las ventanas en segundos
+        """
+        if activities is None:
+            activities = generate_activities(size, seed=seed)
+        # Orden de la API: de más reciente a más antigua
+        self.activities = sorted(activities, key=lambda activity: activity['start_date'], reverse=True)
+        self.by_id = {activity['id']: activity for activity in self.activities}
+        # Inicios en orden ascendente para filtrar before/after por búsqueda binaria
+        self._starts = [_epoch(activity['start_date']) for activity in reversed(self.activities)]
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.limiters = {
+            'X-RateLimit': RateLimiter(rate_limit, short_window, long_window) if rate_limit else None,
+            'X-ReadRateLimit': RateLimiter(read_rate_limit, short_window, long_window) if read_rate_limit else None,
+        }
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def random(self):
+        with self._lock:
+            return self._random.random()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def page(self, page, per_page, before=None, after=None):
+        """Página de actividades con los filtros de /athlete/activities"""
+        total = len(self._starts)
+        low = bisect.bisect_right(self._starts, after) if after is not None else 0
+        high = bisect.bisect_left(self._starts, before) if before is not None else total
+        if high <= low:
+            return []
+        offset = (page - 1) * per_page
+        if after is not None and before is None:
+            # Con after, Strava devuelve las actividades de más antigua a más reciente
+            positions = range(low + offset, min(low + offset + per_page, high))
+            return [self.activities[total - 1 - position] for position in positions]
+        start = total - high + offset
+        return self.activities[start:min(start + per_page, total - low)]
+
+def _epoch(date):
+    return int(datetime.fromisoformat(date.replace('Z', '+00:00')).timestamp())
+
+def _error(message, status, errors=None):
+    response = jsonify({'message': message, 'errors': errors or []})
+    response.status_code = status
+    return response
+
+def _detail(activity):
+    """DetailedActivity: el resumen más los campos que solo devuelve /activities/{id}"""
+    rng = random.Random(activity['id'])
+    moving_hours = (activity.get('moving_time') or 0) / 3600
+    detail = dict(activity, resource_state=3)
+    detail.update({
+        'description': rng.choice(['', 'Buenas sensaciones', 'Con viento', 'Rodaje suave', 'Series']),
+        'calories': round(moving_hours * rng.uniform(350, 750), 1),
+        'device_name': rng.choice(['Garmin Edge 530', 'Garmin Forerunner 255', 'Wahoo ELEMNT BOLT']),
+        'average_cadence': round(rng.uniform(70, 90), 1) if activity.get('type') in ('Ride', 'Run') else None,
+        'average_watts': round(rng.uniform(120, 220), 1) if activity.get('type') == 'Ride' else None,
+        'kilojoules': round(moving_hours * rng.uniform(400, 700), 1) if activity.get('type') == 'Ride' else None,
+    })
+    return detail
+
+def _streams(activity):
+    """Streams latlng, distance, time y altitude a partir de la polilínea resumen"""
+    polyline = (activity.get('map') or {}).get('summary_polyline')
+    points = decode_polyline(polyline) if polyline else []
+    size = len(points)
+    if size < 2:
+        return {}
+    total_distance = activity.get('distance') or 0
+    total_time = activity.get('elapsed_time') or activity.get('moving_time') or 0
+    elev_low = activity.get('elev_low') or 0
+    elev_high = activity.get('elev_high') or elev_low
+    fractions = [i / (size - 1) for i in range(size)]
+    data = {
+        'latlng': [[round(lat, 6), round(lng, 6)] for lat, lng in points],
+        'distance': [round(total_distance * fraction, 1) for fraction in fractions],
+        'time': [int(total_time * fraction) for fraction in fractions],
+        'altitude': [round(elev_low + (elev_high - elev_low) * math.sin(math.pi * fraction), 1) for fraction in fractions],
+    }
+    return {
+        stream_type: {'type': stream_type, 'data': values, 'series_type': 'distance',
+                      'original_size': size, 'resolution': 'high'}
+        for stream_type, values in data.items()
+    }
+
+def create_app(state=None):
+    """Crea la aplicación Flask del simulador sobre un SimulatorState"""
+    state = state or SimulatorState()
+    app = Flask(__name__)
+    app.config['SIMULATOR'] = state
+
+    @app.before_request
+    def simulate():
+        if not request.path.startswith('/api/v3/'):
+            return None
+        endpoint = request.url_rule.endpoint if request.url_rule else 'unknown'
+        state.count(f"requests:{endpoint}")
+
+        authorization = request.headers.get('Authorization', '')
+        if not authorization.startswith('Bearer ') or not authorization[7:].strip():
+            return _error('Authorization Error', 401,
+                          [{'resource': 'Athlete', 'field': 'access_token', 'code': 'invalid'}])
+
+        # Las peticiones rechazadas no consumen cuota
+        g.rate_limit_usage = {}
+        allowed = True
+        for header, limiter in state.limiters.items():
+            if limiter is None or (header == 'X-ReadRateLimit' and request.method != 'GET'):
+                continue
+            ok, usage = limiter.acquire()
+            g.rate_limit_usage[header] = usage
+            allowed = allowed and ok
+        if not allowed:
+            return _error('Rate Limit Exceeded', 429,
+                          [{'resource': 'Application', 'field': 'rate limit', 'code': 'exceeded'}])
+
+        if state.latency_ms or state.jitter_ms:
+            delay = state.latency_ms + (state.random() * 2 - 1) * state.jitter_ms
+            time.sleep(max(delay, 0) / 1000)
+
+        if state.error_rate and state.random() < state.error_rate:
+            return _error('Simulated error', 503 if state.random() < 0.5 else 500)
+        return None
+
+    @app.after_request
+    def rate_limit_headers(response):
+        if request.path.startswith('/api/v3/'):
+            for header, limiter in state.limiters.items():
+                if limiter is None:
+                    continue
+                usage = getattr(g, 'rate_limit_usage', {}).get(header) or limiter.usage()
+                response.headers[f'{header}-Limit'] = ','.join(str(limit) for limit in limiter.limits)
+                response.headers[f'{header}-Usage'] = ','.join(str(value) for value in usage)
+        # Todas las respuestas, también las de error que devuelve simulate()
+        if not request.path.startswith('/simulator/'):
+            state.count(f"status:{response.status_code}")
+        return response
+
+    @app.route('/api/v3/athlete/activities')
+    def athlete_activities():
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+            per_page = min(max(int(request.args.get('per_page', 30)), 1), MAX_PER_PAGE)
+            before = int(request.args['before']) if 'before' in request.args else None
+            after = int(request.args['after']) if 'after' in request.args else None
+        except ValueError:
+            return _error('Bad Request', 400, [{'resource': 'Application', 'field': 'page', 'code': 'invalid'}])
+        return jsonify(state.page(page, per_page, before, after))
+
+    @app.route('/api/v3/activities/<int:activity_id>')
+    def activity_detail(activity_id):
+        activity = state.by_id.get(activity_id)
+        if activity is None:
+            return _error('Resource Not Found', 404, [{'resource': 'Activity', 'field': 'id', 'code': 'not found'}])
+        etag = hashlib.sha1(f"{activity_id}:{activity.get('start_date')}".encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = jsonify(_detail(activity))
+        response.set_etag(etag)
+        return response
+
+    @app.route('/api/v3/activities/<int:activity_id>/streams')
+    def activity_streams(activity_id):
+        activity = state.by_id.get(activity_id)
+        if activity is None:
+            return _error('Resource Not Found', 404, [{'resource': 'Activity', 'field': 'id', 'code': 'not found'}])
+        keys = [key for key in request.args.get('keys', ','.join(STREAM_TYPES)).split(',') if key]
+        streams = {key: stream for key, stream in _streams(activity).items() if key in keys}
+        if request.args.get('key_by_type', 'false').lower() == 'true':
+            return jsonify(streams)
+        return jsonify(list(streams.values()))
+
+    @app.route('/oauth/token', methods=['POST'])
+    def oauth_token():
+        grant_type = request.form.get('grant_type')
+        if grant_type not in ('authorization_code', 'refresh_token') or not request.form.get('client_id'):
+            return _error('Bad Request', 400, [{'resource': 'Application', 'field': 'grant_type', 'code': 'invalid'}])
+        state.count(f"requests:oauth_{grant_type}")
+        tokens = {
+            'token_type': 'Bearer',
+            'access_token': secrets.token_hex(20),
+            'refresh_token': request.form.get('refresh_token') or secrets.token_hex(20),
+            'expires_at': int(time.time()) + TOKEN_LIFETIME,
+            'expires_in': TOKEN_LIFETIME,
+        }
+        if grant_type == 'authorization_code':
+            athlete_id = (state.activities[0]['athlete']['id'] if state.activities else 1)
+            tokens['athlete'] = {'id': athlete_id, 'resource_state': 2}
+        return jsonify(tokens)
+
+    @app.route('/simulator/stats')
+    def simulator_stats():
+        """Peticiones por endpoint y por código de estado, y uso actual de la cuota"""
+        usage = {header: limiter.usage() for header, limiter in state.limiters.items() if limiter is not None}
+        return jsonify({'activities': len(state.activities), 'stats': dict(state.stats), 'usage': usage})
+
+    return app
+
+def start_simulator(state, host='127.0.0.1', port=0):
+    """
+    Arranca el simulador en un hilo
+    Returns:
+        Tupla (servidor, url base de la API, url de tokens)
+    """
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server(host, port, create_app(state), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_port}"
+    return server, f"{base_url}/api/v3", f"{base_url}/oauth/token"
+
+def _limit(value):
+    """Convierte '200,2000' en (200, 2000) y 'none' en None"""
+    if value.lower() == 'none':
+        return None
+    short, long = (int(part) for part in value.split(','))
+    return short, long
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador local de la API de Strava con datos sintéticos")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5002)
+    parser.add_argument('--size', type=int, default=1000, help="Número de actividades sintéticas")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.0,
+                        help="Fracción de actividades grabadas también por un segundo dispositivo")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Latencia añadida por petición")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Variación de la latencia")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fracción de respuestas 500/503")
+    parser.add_argument('--rate-limit', type=_limit, default=DEFAULT_RATE_LIMIT,
+                        help="Límite total '15min,diario' o 'none'")
+    parser.add_argument('--read-rate-limit', type=_limit, default=DEFAULT_READ_RATE_LIMIT,
+                        help="Límite de lectura '15min,diario' o 'none'")
+    parser.add_argument('--window-seconds', type=int, default=900,
+                        help="Duración de la ventana corta (acortarla acelera las pruebas de limitación)")
+    args = parser.parse_args()
+
+    state = SimulatorState(
+        activities=generate_activities(args.size, seed=args.seed, duplicate_ratio=args.duplicate_ratio),
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed,
+        rate_limit=args.rate_limit, read_rate_limit=args.read_rate_limit, short_window=args.window_seconds
+    )
+    logger.info(f"Simulador con {len(state.activities)} actividades en http://{args.host}:{args.port}; "
+                f"STRAVA_API_URL=http://{args.host}:{args.port}/api/v3 "
+                f"STRAVA_TOKEN_URL=http://{args.host}:{args.port}/oauth/token")
+    create_app(state).run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
+import argparse
+import glob
+import hashlib
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from collections import defaultdict
+from app_settings import APP_CONFIG
+from deduplication import deduplicate
+
+# Cambiar al modificar el formato de los totales parciales para invalidar la caché
+PARTIAL_CACHE_VERSION = 1
+# Campos que necesita cada actividad para entrar en los totales
+REQUIRED_ACTIVITY_FIELDS = ('id', 'type', 'start_date_local')
 
 def format_time(minutes):
     """Convierte minutos a formato '00h 00m'"""
@@ -8,9 +20,9 @@ def format_time(minutes):
     mins = int(minutes % 60)
     return f"{hours:02d}h {mins:02d}m"
 
-def load_activities():
+def load_activities(filename='strava_activities.json'):
     """Carga las actividades desde el archivo JSON"""
-    with open('strava_activities.json', 'r', encoding='utf-8') as f:
+    with open(filename, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 def calculate_totals_by_sport(activities):
@@ -101,16 +113,223 @@ def print_summary_by_year(totals):
             if sport.lower() in ['ride', 'run']:
                 print(f"    Elevación total: {data['elevation']:.0f} m")
 
+def print_summary_by_athlete(totals):
+    """Imprime el resumen por atleta"""
+    print("\n=== RESUMEN POR ATLETA ===\n")
+    
+    for athlete in sorted(totals.keys()):
+        print(f"\nATLETA {athlete}:")
+        
+        for sport, data in totals[athlete].items():
+            print(f"  {sport}: {data['count']} actividades, {data['distance']:.2f} km, "
+                  f"{format_time(data['time'])}, {data['elevation']:.0f} m")
+
+def merge_totals(target, source):
+    """
+    Suma en target los totales de source (diccionarios anidados de números)
+    La suma es asociativa y conmutativa, así que los parciales de cada
+    archivo se pueden combinar en cualquier orden.
+    """
+    for key, value in source.items():
+        if isinstance(value, dict):
+            merge_totals(target.setdefault(key, {}), value)
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+def summarize_activities(activities):
+    """
+    Totales parciales de una lista de actividades: {atleta: {año: {deporte: totales}}}
+    Las actividades sin atleta se agrupan bajo la clave ''. Los duplicados se
+    buscan por atleta: dos miembros del club que salen juntos no lo son.
+    """
+    by_athlete = defaultdict(list)
+    for activity in activities:
+        by_athlete[str((activity.get('athlete') or {}).get('id') or '')].append(activity)
+    return {
+        athlete: {
+            str(year): {sport: dict(data) for sport, data in sports.items()}
+            for year, sports in calculate_totals_by_year(deduplicate(athlete_activities)).items()
+        }
+        for athlete, athlete_activities in by_athlete.items()
+    }
+
+def _partial_cache_file(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}-v{PARTIAL_CACHE_VERSION}.json")
+
+def _check_activities(activities):
+    """Devuelve un mensaje de error si el contenido no es una lista de actividades, o None"""
+    if not isinstance(activities, list):
+        return "no es una lista de actividades"
+    for activity in activities:
+        if not isinstance(activity, dict) or any(field not in activity for field in REQUIRED_ACTIVITY_FIELDS):
+            return f"no es una lista de actividades (faltan {', '.join(REQUIRED_ACTIVITY_FIELDS)})"
+    return None
+
+def _summarize_file(task):
+    """
+    Trabajo del pool: totales parciales de un archivo
+    Si el contenido ya se resumió antes (mismo sha256), se lee de la caché.
+    Returns:
+        Tupla (archivo, sha256, parcial, si venía de la caché, error)
+    """
+    filename, cache_dir = task
+    try:
+        with open(filename, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if cache_dir:
+            try:
+                with open(_partial_cache_file(cache_dir, digest), 'r', encoding='utf-8') as f:
+                    return filename, digest, json.load(f), True, None
+            except (OSError, ValueError):
+                pass
+        activities = json.loads(data)
+        error = _check_activities(activities)
+        if error:
+            return filename, digest, None, False, f"{filename}: {error}"
+        return filename, digest, summarize_activities(activities), False, None
+    except Exception as e:
+        return filename, None, None, False, f"{filename}: {str(e)}"
+
+def _write_json_atomic(filename, value):
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+    os.replace(tmp_filename, filename)
+
+def expand_inputs(patterns):
+    """Expande rutas y patrones glob a una lista de archivos sin repetidos"""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for filename in matches:
+            if os.path.isfile(filename) and filename not in files:
+                files.append(filename)
+    return files
+
+def summarize_files(files, cache_dir=None, max_workers=None):
+    """
+    Calcula los totales parciales de cada archivo en un pool de procesos
+    Args:
+        files: Lista de archivos JSON de actividades
+        cache_dir: Directorio de la caché de parciales (None para no usarla)
+        max_workers: Número de procesos del pool (por defecto, uno por CPU)
+    Returns:
+        Tupla (diccionario {archivo: parcial}, lista de errores de los archivos omitidos)
+    """
+    partials = {}
+    errors = []
+    index = {}
+    index_file = os.path.join(cache_dir, 'index.json') if cache_dir else None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+    # Archivos sin cambios (mismo tamaño y fecha de modificación): ni siquiera se leen
+    tasks = []
+    for filename in files:
+        stat = os.stat(filename)
+        entry = index.get(os.path.abspath(filename))
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            try:
+                with open(_partial_cache_file(cache_dir, entry[2]), 'r', encoding='utf-8') as f:
+                    partials[filename] = json.load(f)
+                continue
+            except (OSError, ValueError):
+                pass
+        tasks.append((filename, cache_dir))
+
+    if tasks:
+        if len(tasks) == 1 or max_workers == 1:
+            results = map(_summarize_file, tasks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            chunksize = max(1, len(tasks) // ((max_workers or os.cpu_count() or 1) * 4))
+            results = executor.map(_summarize_file, tasks, chunksize=chunksize)
+        try:
+            for filename, digest, partial, cached, error in results:
+                if error:
+                    errors.append(error)
+                    continue
+                partials[filename] = partial
+                if cache_dir:
+                    if not cached:
+                        _write_json_atomic(_partial_cache_file(cache_dir, digest), partial)
+                    stat = os.stat(filename)
+                    index[os.path.abspath(filename)] = [stat.st_size, stat.st_mtime_ns, digest]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if cache_dir:
+            _write_json_atomic(index_file, index)
+
+    return partials, errors
+
+def build_reports(partials):
+    """
+    Combina los parciales en los informes del club, por atleta y por año
+    Las actividades sin atleta se asignan al nombre del archivo.
+    """
+    by_athlete_year = {}
+    for filename, partial in partials.items():
+        for athlete, years in partial.items():
+            athlete = athlete or os.path.splitext(os.path.basename(filename))[0]
+            merge_totals(by_athlete_year.setdefault(athlete, {}), years)
+
+    by_sport, by_year, by_athlete = {}, {}, {}
+    for athlete, years in by_athlete_year.items():
+        for year, sports in years.items():
+            merge_totals(by_year.setdefault(int(year), {}), sports)
+            merge_totals(by_athlete.setdefault(athlete, {}), sports)
+            merge_totals(by_sport, sports)
+    return {'by_sport': by_sport, 'by_year': by_year, 'by_athlete': by_athlete}
+
 def main():
-    activities = load_activities()
+    parser = argparse.ArgumentParser(description="Resumen de actividades de uno o varios archivos")
+    parser.add_argument('inputs', nargs='*', default=[APP_CONFIG['data_file']],
+                        help="Archivos JSON o patrones glob (p. ej. 'club/**/*.json')")
+    parser.add_argument('--workers', type=int, default=None, help="Número de procesos")
+    parser.add_argument('--cache-dir', default=APP_CONFIG['summary_cache_dir'],
+                        help="Directorio de la caché de totales parciales por archivo")
+    parser.add_argument('--no-cache', action='store_true', help="No usar la caché de parciales")
+    parser.add_argument('--json', dest='json_file', help="Guarda también los informes en este archivo JSON")
+    args = parser.parse_args()
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("No se encontró ningún archivo de actividades")
+        return
+
+    # Las grabaciones duplicadas (p. ej. reloj y ciclocomputador) se descartan en cada archivo
+    partials, errors = summarize_files(files, None if args.no_cache else args.cache_dir, args.workers)
+    if errors:
+        print(f"{len(errors)} archivos omitidos:")
+        for error in errors:
+            print(f"  {error}")
+    if not partials:
+        print("No se encontró ningún archivo de actividades válido")
+        return
+    reports = build_reports(partials)
     
     # Resumen por deporte
-    totals_by_sport = calculate_totals_by_sport(activities)
-    print_summary_by_sport(totals_by_sport)
+    print_summary_by_sport(reports['by_sport'])
     
     # Resumen por año
-    totals_by_year = calculate_totals_by_year(activities)
-    print_summary_by_year(totals_by_year)
+    print_summary_by_year(reports['by_year'])
+    
+    # Resumen por atleta (solo tiene sentido con varios)
+    if len(reports['by_athlete']) > 1:
+        print_summary_by_athlete(reports['by_athlete'])
+    
+    if args.json_file:
+        with open(args.json_file, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
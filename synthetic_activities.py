@@ -0,0 +1,221 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from polyline_codec import encode_polyline
+
+# Perfiles por tipo de actividad: (peso, distancia media km, velocidad media km/h, desnivel m/km)
+ACTIVITY_PROFILES = {
+    'Ride': (0.45, 55.0, 25.0, 9.0),
+    'Run': (0.25, 10.0, 11.0, 6.0),
+    'Walk': (0.10, 6.0, 5.0, 4.0),
+    'Hike': (0.05, 12.0, 4.0, 45.0),
+    'Swim': (0.06, 2.0, 2.5, 0.0),
+    'InlineSkate': (0.04, 15.0, 14.0, 1.0),
+    'WeightTraining': (0.05, 0.0, 0.0, 0.0),
+}
+
+ACTIVITY_NAMES = {
+    'Ride': 'Ride',
+    'Run': 'Run',
+    'Walk': 'Walk',
+    'Hike': 'Hike',
+    'Swim': 'Swim',
+    'InlineSkate': 'Inline Skate',
+    'WeightTraining': 'Weight Training',
+}
+
+# Punto de partida de las rutas sintéticas (alrededores de Vitoria-Gasteiz)
+BASE_LATLNG = (42.8467, -2.6716)
+
+def _time_of_day_name(hour):
+    """Devuelve el prefijo de nombre que usa Strava según la hora de inicio"""
+    if hour < 11:
+        return 'Morning'
+    if hour < 14:
+        return 'Lunch'
+    if hour < 18:
+        return 'Afternoon'
+    if hour < 21:
+        return 'Evening'
+    return 'Night'
+
+def _generate_routes(rng, n_routes, points_per_route=16):
+    """Genera un conjunto de rutas base (bucles) que se repiten entre actividades"""
+    routes = []
+    for _ in range(n_routes):
+        start_lat = BASE_LATLNG[0] + rng.uniform(-0.05, 0.05)
+        start_lng = BASE_LATLNG[1] + rng.uniform(-0.05, 0.05)
+        radius = rng.uniform(0.01, 0.2)
+        phase = rng.uniform(0, 2 * math.pi)
+        points = []
+        for i in range(points_per_route):
+            angle = phase + 2 * math.pi * i / (points_per_route - 1)
+            points.append((
+                start_lat + radius * (math.sin(angle) - math.sin(phase)),
+                start_lng + radius * (math.cos(angle) - math.cos(phase)) * 1.35
+            ))
+        routes.append(points)
+    return routes
+
+def generate_activity(rng, activity_id, start, athlete_id=1, route=None):
+    """
+    Genera una actividad con la misma forma que devuelve /athlete/activities
+    Args:
+        rng: Instancia de random.Random
+        activity_id: Identificador de la actividad
+        start: datetime de inicio (UTC)
+        athlete_id: Identificador del atleta
+        route: Lista de puntos (lat, lng) de la ruta o None para actividades sin GPS
+    """
+    types = list(ACTIVITY_PROFILES.keys())
+    weights = [profile[0] for profile in ACTIVITY_PROFILES.values()]
+    activity_type = rng.choices(types, weights=weights)[0]
+    _, mean_km, mean_kmh, elev_per_km = ACTIVITY_PROFILES[activity_type]
+
+    distance_km = max(0.0, rng.gauss(mean_km, mean_km * 0.4))
+    if mean_kmh > 0:
+        speed_kmh = max(1.0, rng.gauss(mean_kmh, mean_kmh * 0.12))
+        moving_time = int(distance_km / speed_kmh * 3600)
+    else:
+        distance_km = 0.0
+        moving_time = int(rng.uniform(1800, 5400))
+    moving_time = max(moving_time, 60)
+    elapsed_time = int(moving_time * rng.uniform(1.0, 1.35))
+    elevation = round(distance_km * elev_per_km * rng.uniform(0.3, 1.8), 1)
+    average_speed = round(distance_km * 1000 / moving_time, 3)
+    has_gps = route is not None and distance_km > 0
+    has_heartrate = rng.random() < 0.8
+    elev_low = round(rng.uniform(450, 750), 1)
+
+    utc_offset = 7200.0
+    start_local = start + timedelta(seconds=utc_offset)
+
+    if has_gps:
+        polyline = encode_polyline([
+            (lat + rng.gauss(0, 0.0002), lng + rng.gauss(0, 0.0002)) for lat, lng in route
+        ])
+        start_latlng = [round(route[0][0], 6), round(route[0][1], 6)]
+        end_latlng = [round(route[-1][0], 6), round(route[-1][1], 6)]
+    else:
+        polyline = ''
+        start_latlng = []
+        end_latlng = []
+
+    return {
+        'resource_state': 2,
+        'athlete': {'id': athlete_id, 'resource_state': 1},
+        'name': f"{_time_of_day_name(start_local.hour)} {ACTIVITY_NAMES[activity_type]}",
+        'distance': round(distance_km * 1000, 1),
+        'moving_time': moving_time,
+        'elapsed_time': elapsed_time,
+        'total_elevation_gain': elevation,
+        'type': activity_type,
+        'sport_type': activity_type,
+        'workout_type': None,
+        'id': activity_id,
+        'start_date': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'start_date_local': start_local.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'timezone': '(GMT+01:00) Europe/Madrid',
+        'utc_offset': utc_offset,
+        'location_city': None,
+        'location_state': None,
+        'location_country': 'Spain',
+        'achievement_count': rng.randint(0, 5),
+        'kudos_count': rng.randint(0, 20),
+        'comment_count': rng.randint(0, 3),
+        'athlete_count': rng.randint(1, 4),
+        'photo_count': 0,
+        'map': {
+            'id': f"a{activity_id}",
+            'summary_polyline': polyline,
+            'resource_state': 2
+        },
+        'trainer': not has_gps and activity_type == 'Ride',
+        'commute': False,
+        'manual': False,
+        'private': False,
+        'visibility': 'everyone',
+        'flagged': False,
+        'gear_id': None,
+        'start_latlng': start_latlng,
+        'end_latlng': end_latlng,
+        'average_speed': average_speed,
+        'max_speed': round(average_speed * rng.uniform(1.3, 2.2), 3),
+        'has_heartrate': has_heartrate,
+        'average_heartrate': round(rng.uniform(100, 160), 1) if has_heartrate else None,
+        'max_heartrate': float(rng.randint(150, 190)) if has_heartrate else None,
+        'heartrate_opt_out': False,
+        'display_hide_heartrate_option': has_heartrate,
+        'elev_high': round(elev_low + elevation * rng.uniform(0.2, 0.6), 1),
+        'elev_low': elev_low,
+        'upload_id': activity_id * 10 + 3,
+        'upload_id_str': str(activity_id * 10 + 3),
+        'external_id': f"garmin_ping_{activity_id}",
+        'from_accepted_tag': False,
+        'pr_count': rng.randint(0, 3),
+        'total_photo_count': 0,
+        'has_kudoed': False,
+        'suffer_score': float(rng.randint(5, 200)) if has_heartrate else None
+    }
+
+def _duplicate_recording(rng, activity, activity_id):
+    """Segunda grabación de la misma actividad desde otro dispositivo (reloj y ciclocomputador)"""
+    duplicate = dict(activity)
+    offset = rng.randint(-90, 90)
+    for field in ('start_date', 'start_date_local'):
+        shifted = datetime.strptime(activity[field], '%Y-%m-%dT%H:%M:%SZ') + timedelta(seconds=offset)
+        duplicate[field] = shifted.strftime('%Y-%m-%dT%H:%M:%SZ')
+    duplicate['id'] = activity_id
+    duplicate['distance'] = round(activity['distance'] * rng.uniform(0.97, 1.03), 1)
+    duplicate['elapsed_time'] = int(activity['elapsed_time'] * rng.uniform(0.95, 1.05))
+    duplicate['moving_time'] = min(activity['moving_time'], duplicate['elapsed_time'])
+    duplicate['has_heartrate'] = False
+    duplicate['average_heartrate'] = None
+    duplicate['max_heartrate'] = None
+    duplicate['upload_id'] = activity_id * 10 + 3
+    duplicate['upload_id_str'] = str(activity_id * 10 + 3)
+    duplicate['external_id'] = f"wahoo_{activity_id}"
+    duplicate['map'] = dict(activity['map'], id=f"a{activity_id}")
+    return duplicate
+
+def generate_activities(n, seed=0, start_date=None, n_routes=50, athlete_id=1, duplicate_ratio=0.0):
+    """
+    Genera n actividades sintéticas ordenadas de más reciente a más antigua,
+    igual que las devuelve la API de Strava
+    Args:
+        n: Número de actividades a generar
+        seed: Semilla para que los datos sean reproducibles
+        start_date: Fecha de la actividad más antigua (por defecto 2010-01-01 UTC)
+        n_routes: Número de rutas base que se repiten entre actividades
+        athlete_id: Identificador del atleta
+        duplicate_ratio: Fracción de actividades grabadas también por un segundo dispositivo
+            (las copias cuentan dentro de las n actividades)
+    """
+    rng = random.Random(seed)
+    if start_date is None:
+        start_date = datetime(2010, 1, 1, tzinfo=timezone.utc)
+
+    routes = _generate_routes(rng, n_routes)
+    # Separación media entre actividades para que la densidad sea realista (~1,5 al día)
+    mean_gap = 16 * 3600
+    current = start_date
+    activities = []
+
+    for i in range(n):
+        activity_id = 1000000000 + i
+        if activities and rng.random() < duplicate_ratio:
+            activities.append(_duplicate_recording(rng, activities[-1], activity_id))
+            continue
+        current = current + timedelta(seconds=int(rng.expovariate(1 / mean_gap)) + 3600)
+        start = current.replace(hour=rng.randint(6, 20))
+        if activities:
+            # Una persona no hace dos actividades a la vez: empezar después de la anterior
+            start = max(start, previous_end + timedelta(minutes=30))
+            current = max(current, start)
+        route = rng.choice(routes) if rng.random() < 0.85 else None
+        activity = generate_activity(rng, activity_id, start, athlete_id, route)
+        previous_end = start + timedelta(seconds=activity['elapsed_time'])
+        activities.append(activity)
+
+    activities.reverse()
+    return activities
@@ -0,0 +1,103 @@
+import gzip
+import struct
+from datetime import datetime, timezone
+import pytest
+from activity_file_parsers import (FIT_EPOCH_OFFSET, parse_activity_file, parse_fit, parse_gpx,
+                                   parse_tcx, summarize_points)
+
+GPX = b'''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+  <trk><trkseg>
+    <trkpt lat="40.4000" lon="-3.7000"><ele>650.0</ele><time>2024-03-01T08:00:00Z</time>
+      <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>120</gpxtpx:hr></gpxtpx:TrackPointExtension></extensions>
+    </trkpt>
+    <trkpt lat="40.4010" lon="-3.7000"><ele>655.0</ele><time>2024-03-01T08:00:30Z</time></trkpt>
+    <trkpt lat="40.4020" lon="-3.7000"><time>2024-03-01T08:01:00Z</time></trkpt>
+  </trkseg></trk>
+</gpx>'''
+
+TCX = b'''<?xml version="1.0" encoding="UTF-8"?>
+<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">
+  <Activities><Activity Sport="Running"><Lap><Track>
+    <Trackpoint><Time>2024-03-01T08:00:00Z</Time>
+      <Position><LatitudeDegrees>40.4</LatitudeDegrees><LongitudeDegrees>-3.7</LongitudeDegrees></Position>
+      <AltitudeMeters>650</AltitudeMeters><DistanceMeters>0</DistanceMeters>
+      <HeartRateBpm><Value>130</Value></HeartRateBpm>
+    </Trackpoint>
+    <Trackpoint><Time>2024-03-01T08:01:00Z</Time><DistanceMeters>250.5</DistanceMeters></Trackpoint>
+  </Track></Lap></Activity></Activities>
+</TrainingCenterDatabase>'''
+
+def fit_file(*messages):
+    """Fichero FIT con cabecera de 14 bytes; los CRC no se comprueban"""
+    body = b''.join(messages)
+    header = struct.pack('<BBHI4sH', 14, 0x10, 2093, len(body), b'.FIT', 0)
+    return header + body + b'\x00\x00'
+
+def definition(local_type, global_type, fields, dev_fields=(), endian='<'):
+    header = 0x40 | local_type | (0x20 if dev_fields else 0)
+    content = struct.pack(f'{endian}BBBHB', header, 0, 1 if endian == '>' else 0, global_type, len(fields))
+    content += b''.join(struct.pack('BBB', *field) for field in fields)
+    if dev_fields:
+        content += bytes([len(dev_fields)]) + b''.join(struct.pack('BBB', *field) for field in dev_fields)
+    return content
+
+def semicircles(degrees):
+    return round(degrees / 180 * 2 ** 31)
+
+def fit_time(seconds):
+    return datetime.fromtimestamp(seconds + FIT_EPOCH_OFFSET, tz=timezone.utc)
+
+def test_parse_gpx():
+    points = parse_gpx(GPX)
+    assert points['time'][1] == datetime(2024, 3, 1, 8, 0, 30, tzinfo=timezone.utc)
+    assert points['latlng'] == [(40.4, -3.7), (40.401, -3.7), (40.402, -3.7)]
+    assert points['altitude'] == [650.0, 655.0, None]
+    assert points['heartrate'] == [120.0, None, None]
+
+def test_parse_tcx():
+    points = parse_tcx(TCX)
+    assert points['latlng'] == [(40.4, -3.7), None]
+    assert points['distance'] == [0.0, 250.5]
+    assert points['heartrate'] == [130.0, None]
+
+def test_parse_fit_compressed_timestamps_and_developer_fields():
+    start = 1_000_000_000
+    record_fields = [(253, 4, 0x86), (0, 4, 0x85), (1, 4, 0x85), (2, 2, 0x84), (3, 1, 0x02), (5, 4, 0x86)]
+    data = fit_file(
+        # Mensaje de evento (global 21) con marca de tiempo y un campo que se ignora
+        definition(0, 21, [(253, 4, 0x86), (0, 1, 0x00)]),
+        struct.pack('<BIB', 0x00, start, 0),
+        # Registro completo con dos bytes de campos de desarrollador
+        definition(1, 20, record_fields, dev_fields=[(0, 2, 0)]),
+        struct.pack('<BIiiHBI', 0x01, start + 2, semicircles(40.4), semicircles(-3.7), 3750, 140, 0) + b'\xaa\xbb',
+        # Registros sin timestamp, en big-endian, con marca de tiempo comprimida
+        definition(2, 20, [(0, 4, 0x85), (1, 4, 0x85), (3, 1, 0x02), (5, 4, 0x86)], dev_fields=[(0, 3, 0)],
+                   endian='>'),
+        struct.pack('>BiiBI', 0x80 | (2 << 5) | ((start + 10) & 0x1F), semicircles(40.401), semicircles(-3.7),
+                    0xFF, 11000) + b'\x01\x02\x03',
+        # El desplazamiento menor que el anterior indica que los 5 bits han dado la vuelta
+        struct.pack('>BiiBI', 0x80 | (2 << 5) | ((start + 40) & 0x1F), semicircles(40.402), semicircles(-3.7),
+                    150, 22000) + b'\x01\x02\x03',
+    )
+    points = parse_fit(data)
+
+    assert points['time'] == [fit_time(start + 2), fit_time(start + 10), fit_time(start + 40)]
+    assert [round(lat, 5) for lat, _ in points['latlng']] == [40.4, 40.401, 40.402]
+    assert points['altitude'] == [250.0, None, None]
+    assert points['heartrate'] == [140.0, None, 150.0]
+    assert points['distance'] == [0.0, 110.0, 220.0]
+
+def test_parse_fit_rejects_other_files():
+    with pytest.raises(ValueError):
+        parse_fit(b'\x0e\x10' + b'\x00' * 12)
+
+def test_parse_activity_file_gzip_and_summary():
+    points = parse_activity_file('activity.tcx.gz', gzip.compress(TCX))
+    summary, streams = summarize_points(points)
+    assert summary['start_date'] == '2024-03-01T08:00:00Z'
+    assert summary['distance'] == 250.5
+    assert summary['elapsed_time'] == 60
+    assert streams['time']['data'] == [0, 60]
+    assert parse_activity_file('activity.kml', b'') is None
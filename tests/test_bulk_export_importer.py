@@ -0,0 +1,47 @@
+import gzip
+import json
+import struct
+import zipfile
+from bulk_export_importer import import_bulk_export
+from test_activity_file_parsers import GPX, TCX, definition, fit_file, semicircles
+
+def fit_activity():
+    start = 1_000_000_000
+    fields = [(253, 4, 0x86), (0, 4, 0x85), (1, 4, 0x85), (5, 4, 0x86)]
+    records = [
+        struct.pack('<BIiiI', 0x00, start + 60 * i, semicircles(40.4 + 0.001 * i), semicircles(-3.7), 11000 * i)
+        for i in range(3)
+    ]
+    return fit_file(definition(0, 20, fields), *records)
+
+def test_import_bulk_export(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_rows = [
+        'Activity ID,Activity Date,Activity Name,Activity Type,Distance,Filename',
+        '1,"Mar 1, 2024, 8:00:00 AM",Gpx,Run,,activities/1.gpx',
+        '2,"Mar 2, 2024, 8:00:00 AM",Tcx,Run,,activities/2.tcx',
+        '3,"Mar 3, 2024, 8:00:00 AM",Fit,Ride,,activities/3.fit.gz',
+        '4,"Mar 4, 2024, 8:00:00 AM",Manual,Run,5000,',
+    ]
+    zip_path = tmp_path / 'export.zip'
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        zf.writestr('activities.csv', '\n'.join(csv_rows) + '\n')
+        zf.writestr('activities/1.gpx', GPX)
+        zf.writestr('activities/2.tcx', TCX)
+        zf.writestr('activities/3.fit.gz', gzip.compress(fit_activity()))
+
+    result = import_bulk_export(str(zip_path), data_file='activities.json', streams_dir='streams',
+                                max_workers=1, silent=True)
+
+    assert result['success'], result
+    assert result['errors'] == []
+    with open('activities.json', encoding='utf-8') as f:
+        activities = {activity['id']: activity for activity in json.load(f)}
+    assert set(activities) == {1, 2, 3, 4}
+    assert activities[1]['has_heartrate'] and activities[1]['map']['summary_polyline']
+    assert activities[2]['distance'] == 250.5
+    assert activities[3]['type'] == 'Ride'
+    assert activities[3]['distance'] == 220.0
+    assert activities[3]['elapsed_time'] == 120
+    assert activities[4]['manual'] and activities[4]['distance'] == 5000.0
+    assert sorted(path.name for path in (tmp_path / 'streams').iterdir()) == ['1.json', '2.json', '3.json']
@@ -0,0 +1,81 @@
+import json
+import random
+import pytest
+from deduplication import DuplicateIndex, deduplicate, update_duplicates_index
+from synthetic_activities import generate_activities
+
+def activity(activity_id, start, elapsed=3600, distance=10000.0, activity_type='Ride', **fields):
+    return dict({'id': activity_id, 'type': activity_type, 'start_date': start,
+                 'elapsed_time': elapsed, 'distance': distance}, **fields)
+
+@pytest.fixture(scope='module')
+def activities():
+    return generate_activities(400, seed=3, duplicate_ratio=0.15)
+
+def test_shuffled_upserts_match_from_activities(activities):
+    expected = DuplicateIndex.from_activities(activities).duplicates()
+    assert len(expected) > 20
+    for seed in range(3):
+        shuffled = list(activities)
+        random.Random(seed).shuffle(shuffled)
+        index = DuplicateIndex()
+        for item in shuffled:
+            index.upsert(item)
+        assert index.duplicates() == expected
+
+def test_json_round_trip(activities, tmp_path):
+    index = DuplicateIndex.from_activities(activities)
+    restored = DuplicateIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+    assert restored.duplicates() == index.duplicates()
+    assert sorted(restored.ids()) == sorted(index.ids())
+    # Sin cambios, volver a insertar no modifica el índice restaurado
+    assert not any(restored.upsert(item) for item in activities)
+
+    filename = str(tmp_path / 'duplicates.json')
+    update_duplicates_index(activities, filename)
+    assert update_duplicates_index(activities[10:], filename).duplicates() == \
+        DuplicateIndex.from_activities(activities[10:]).duplicates()
+
+def test_edit_and_remove_linked_pair():
+    watch = activity(1, '2024-05-01T08:00:00Z', has_heartrate=True)
+    bike_computer = activity(2, '2024-05-01T08:01:00Z', distance=10100.0)
+    index = DuplicateIndex.from_activities([watch, bike_computer])
+    assert index.duplicates() == {2: 1}
+
+    # Editar la hora de una de las dos rompe el par
+    assert index.upsert(dict(bike_computer, start_date='2024-05-01T12:00:00Z'))
+    assert index.duplicates() == {}
+    assert index.upsert(bike_computer)
+    assert index.duplicates() == {2: 1}
+
+    # Un tipo incompatible tampoco es duplicado
+    assert index.upsert(dict(bike_computer, type='Swim'))
+    assert index.duplicates() == {}
+    index.upsert(bike_computer)
+
+    index.remove(1)
+    assert index.duplicates() == {}
+    assert index.ids() == [2]
+    assert index.to_dict()['edges'] == {}
+
+def test_keeps_the_most_complete_recording():
+    base = activity(10, '2024-05-01T08:00:00Z', manual=True)
+    with_gps = activity(11, '2024-05-01T08:00:30Z', map={'summary_polyline': '_p~iF~ps|U'})
+    with_heartrate = activity(12, '2024-05-01T08:01:00Z', distance=9900.0, has_heartrate=True)
+    index = DuplicateIndex.from_activities([base, with_gps, with_heartrate])
+    assert index.duplicates() == {10: 12, 11: 12}
+
+    # A igualdad de calidad se conserva la subida más antigua (menor id)
+    twins = [activity(21, '2024-06-01T08:00:00Z'), activity(20, '2024-06-01T08:00:10Z')]
+    assert DuplicateIndex.from_activities(twins).duplicates() == {21: 20}
+    assert [item['id'] for item in deduplicate(twins)] == [20]
+    # Con la misma calidad salvo la distancia, gana la más larga
+    longer = [activity(30, '2024-07-01T08:00:00Z'), activity(31, '2024-07-01T08:00:10Z', distance=10200.0)]
+    assert DuplicateIndex.from_activities(longer).duplicates() == {30: 31}
+
+def test_long_activity_inserted_after_short_overlaps():
+    index = DuplicateIndex()
+    index.upsert(activity(1, '2024-05-01T10:00:00Z', elapsed=600, distance=2000.0))
+    # Empieza antes que la corta, que ya estaba en el índice, y dura más que ninguna
+    index.upsert(activity(2, '2024-05-01T09:59:00Z', elapsed=660, distance=2000.0))
+    assert index.duplicates() == {2: 1}
@@ -0,0 +1,86 @@
+import json
+import random
+import pytest
+from records_index import RECORD_METRICS, RecordsIndex, update_records_index
+
+TYPES = ('Run', 'Ride')
+
+def make_activities(n=300, seed=0):
+    rng = random.Random(seed)
+    activities = []
+    for activity_id in range(1, n + 1):
+        activity = {
+            'id': activity_id,
+            'type': rng.choice(TYPES),
+            'start_date_local': f"{rng.randint(2019, 2023)}-{rng.randint(1, 12):02d}-10T08:00:00Z",
+        }
+        for metric in RECORD_METRICS:
+            # Valores repetidos para que los empates se resuelvan por id
+            if rng.random() > 0.1:
+                activity[metric] = float(rng.randint(1, 60) * 100)
+        activities.append(activity)
+    return activities
+
+def brute_force(activities, metric, activity_type, years=None, allowed_ids=None):
+    """Sort-and-filter de referencia: (id, valor) de mayor a menor y, a igualdad, por id"""
+    selected = [
+        (activity['id'], float(activity[metric])) for activity in activities
+        if activity['type'] == activity_type and activity.get(metric) is not None
+        and (years is None or int(activity['start_date_local'][:4]) in years)
+        and (allowed_ids is None or activity['id'] in allowed_ids)
+    ]
+    return sorted(selected, key=lambda item: (-item[1], item[0]))
+
+def check(index, activities):
+    allowed_ids = {activity['id'] for activity in activities if activity['id'] % 3}
+    for metric in RECORD_METRICS:
+        for activity_type in TYPES:
+            for years in (None, [2021], [2019, 2023], [2020, 2021, 2022], [2030]):
+                expected = brute_force(activities, metric, activity_type, years)
+                assert index.top(metric, activity_type, years, n=15) == expected[:15]
+                assert index.top(metric, activity_type, years, n=len(activities)) == expected
+                assert index.top(metric, activity_type, years, n=10, allowed_ids=allowed_ids) == \
+                    brute_force(activities, metric, activity_type, years, allowed_ids)[:10]
+                for threshold in (0, 2500.0, 2550.0, 6000.0, 10000.0):
+                    assert index.at_least(metric, activity_type, threshold, years) == \
+                        [item for item in expected if item[1] >= threshold]
+
+@pytest.fixture
+def activities():
+    return make_activities()
+
+def test_top_and_at_least_match_brute_force(activities):
+    check(RecordsIndex.from_activities(activities), activities)
+
+def test_upsert_and_remove(activities):
+    index = RecordsIndex.from_activities(activities)
+    edited = dict(activities[5], distance=999999.0, start_date_local='2022-01-01T08:00:00Z')
+    assert index.upsert(edited)
+    assert not index.upsert(edited)
+    activities[5] = edited
+    assert index.top('distance', edited['type'], n=1) == [(edited['id'], 999999.0)]
+
+    # Quitar una métrica la borra de sus listas
+    without_speed = dict(activities[7])
+    without_speed.pop('average_speed', None)
+    index.upsert(without_speed)
+    activities[7] = without_speed
+
+    for activity in activities[:40]:
+        index.remove(activity['id'])
+    index.remove(123456)
+    remaining = activities[40:]
+    assert len(index) == len(remaining)
+    check(index, remaining)
+
+def test_json_round_trip_and_update(activities, tmp_path):
+    index = RecordsIndex.from_activities(activities)
+    restored = RecordsIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+    check(restored, activities)
+    assert not any(restored.upsert(activity) for activity in activities)
+
+    filename = str(tmp_path / 'records.json')
+    update_records_index(activities, filename)
+    shuffled = list(activities[20:])
+    random.Random(1).shuffle(shuffled)
+    check(update_records_index(shuffled, filename), shuffled)
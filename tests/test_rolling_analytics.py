@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from rolling_analytics import DAILY_METRICS, DailyCumulative
+
+@pytest.fixture(scope='module')
+def activities():
+    rng = np.random.default_rng(0)
+    n = 600
+    starts = pd.Timestamp('2019-03-10') + pd.to_timedelta(rng.uniform(0, 1000, n), unit='D')
+    return pd.DataFrame({
+        'start_date_local': starts,
+        'type': rng.choice(['Run', 'Ride', 'Swim'], n),
+        'distance_km': rng.uniform(1, 80, n),
+        'moving_time_hours': rng.uniform(0.2, 4, n),
+        'total_elevation_gain': np.where(rng.random(n) < 0.1, np.nan, rng.uniform(0, 900, n)),
+    })
+
+def daily_series(df, metric, start, end, types=None):
+    """Totales diarios de start a end (incluidos) por fuerza bruta"""
+    if types is not None:
+        df = df[df['type'].isin(types)]
+    df = df[(df['start_date_local'] >= start) & (df['start_date_local'] < end + pd.Timedelta(days=1))]
+    daily = df.groupby(df['start_date_local'].dt.normalize())[metric].sum()
+    return daily.reindex(pd.date_range(start, end, freq='D'), fill_value=0.0)
+
+@pytest.mark.parametrize('types', [None, ['Run'], ['Run', 'Swim'], ['Hike']])
+@pytest.mark.parametrize('days', [1, 7, 28, 365])
+def test_rolling_matches_pandas(activities, days, types):
+    daily = DailyCumulative(activities, end_date='2022-01-15')
+    for metric in DAILY_METRICS:
+        expected = daily_series(activities, metric, daily.origin, daily.end_date, types)
+        expected = expected.rolling(days, min_periods=1).sum()
+        result = daily.rolling(days, metric, types)
+        np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), atol=1e-10)
+        assert result.index.equals(expected.index)
+
+def test_window_total_matches_brute_force(activities):
+    daily = DailyCumulative(activities, end_date='2022-01-15')
+    for date in ['2019-03-10', '2019-04-02', '2020-02-29', '2021-12-31', '2030-01-01', '2010-01-01']:
+        for days in (1, 7, 90, 365):
+            end = pd.Timestamp(date) + pd.Timedelta(days=1)
+            in_window = activities[(activities['start_date_local'] >= end - pd.Timedelta(days=days))
+                                   & (activities['start_date_local'] < min(end, daily.end_date + pd.Timedelta(days=1)))]
+            for types in (None, ['Ride']):
+                selected = in_window if types is None else in_window[in_window['type'].isin(types)]
+                assert daily.window_total(date, days, 'distance_km', types) == pytest.approx(
+                    selected['distance_km'].sum(), abs=1e-10)
+
+@pytest.mark.parametrize('end_date', ['2021-12-05', '2020-07-01'])
+def test_year_over_year_matches_brute_force(activities, end_date):
+    daily = DailyCumulative(activities, end_date=end_date)
+    end = pd.Timestamp(end_date)
+    years = [2018, 2019, 2020, 2021]
+    result = daily.year_over_year('moving_time_hours', years, types=['Run', 'Ride'])
+
+    assert list(result.columns) == years
+    assert list(result.index) == list(range(1, 367))
+    for year in years:
+        year_end = pd.Timestamp(year=year, month=12, day=31)
+        expected = daily_series(activities, 'moving_time_hours', pd.Timestamp(year=year, month=1, day=1),
+                                year_end, ['Run', 'Ride']).cumsum()
+        # Después de end_date no hay datos
+        expected[expected.index > end] = np.nan
+        expected = expected.to_numpy()
+        # Los años no bisiestos no tienen día 366
+        assert len(expected) == (366 if year == 2020 else 365)
+        expected = np.concatenate((expected, [np.nan] * (366 - len(expected))))
+        np.testing.assert_allclose(result[year].to_numpy(), expected, atol=1e-10)
+
+def test_end_date_drops_later_activities(activities):
+    daily = DailyCumulative(activities, end_date='2020-06-30')
+    assert daily.dates[-1] == pd.Timestamp('2020-06-30')
+    expected = activities[activities['start_date_local'] < pd.Timestamp('2020-07-01')]['distance_km'].sum()
+    assert daily.rolling(10000, 'distance_km').iloc[-1] == pytest.approx(expected, abs=1e-10)
+
+    with pytest.raises(ValueError):
+        DailyCumulative(activities, end_date='2019-01-01')
+
+def test_timezone_aware_dates(activities):
+    aware = activities.assign(start_date_local=activities['start_date_local'].dt.tz_localize('UTC'))
+    naive = DailyCumulative(activities, end_date='2021-06-01')
+    np.testing.assert_allclose(DailyCumulative(aware, end_date='2021-06-01').cum, naive.cum)
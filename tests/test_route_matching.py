@@ -0,0 +1,110 @@
+import functools
+import math
+import numpy as np
+import pytest
+from polyline_codec import encode_polyline
+from route_matching import (MATCH_THRESHOLD_M, METERS_PER_DEGREE, RouteIndex, _to_meters,
+                            discrete_frechet, route_signature)
+
+def brute_frechet(p, q):
+    """Definición recursiva de Eiter y Mannila"""
+    @functools.lru_cache(maxsize=None)
+    def c(i, j):
+        d = float(np.hypot(*(p[i] - q[j])))
+        if i == 0 and j == 0:
+            return d
+        if i == 0:
+            return max(c(0, j - 1), d)
+        if j == 0:
+            return max(c(i - 1, 0), d)
+        return max(min(c(i - 1, j), c(i - 1, j - 1), c(i, j - 1)), d)
+    return c(len(p) - 1, len(q) - 1)
+
+def make_activity(activity_id, points, start_date='2024-01-01T08:00:00Z'):
+    return {'id': activity_id, 'start_date': start_date, 'distance': 5000.0,
+            'map': {'summary_polyline': encode_polyline([tuple(point) for point in points])}}
+
+def loop(lat, lng, radius_m=800.0, n=20):
+    """Bucle aproximadamente circular que empieza y acaba en (lat, lng)"""
+    angles = np.linspace(0, 2 * math.pi, n)
+    north = radius_m * (np.cos(angles) - 1)
+    east = radius_m * np.sin(angles)
+    return np.column_stack((lat + north / METERS_PER_DEGREE,
+                            lng + east / (METERS_PER_DEGREE * math.cos(math.radians(lat)))))
+
+@pytest.mark.parametrize('n,m', [(1, 1), (1, 5), (4, 1), (6, 6), (7, 11), (12, 5)])
+def test_discrete_frechet_matches_brute_force(n, m):
+    rng = np.random.default_rng(n * 100 + m)
+    query = rng.normal(size=(n, 2)) * 100
+    candidates = rng.normal(size=(5, m, 2)) * 100
+    result = discrete_frechet(query, candidates)
+    expected = [brute_frechet(query, candidate) for candidate in candidates]
+    np.testing.assert_allclose(result, expected)
+
+@pytest.mark.parametrize('lat', [40.4, 69.6])
+def test_filters_never_drop_a_valid_match(lat):
+    rng = np.random.default_rng(int(lat))
+    base = loop(lat, -3.7)
+    index = RouteIndex()
+    # Rutas que se alejan de la base cada vez más, hasta varias veces el umbral
+    for activity_id in range(1, 61):
+        shift = rng.normal(size=2) * (rng.uniform(0, 3 * MATCH_THRESHOLD_M) / METERS_PER_DEGREE)
+        points = base + shift + rng.normal(size=base.shape) * (20 / METERS_PER_DEGREE)
+        signature = route_signature(make_activity(activity_id, points))
+        index._add_route(activity_id, {'leader': activity_id, 'points': signature['points'].tolist(),
+                                       'bbox': signature['bbox'], 'start_cell': list(signature['start_cell']),
+                                       'end_cell': list(signature['end_cell']), 'distance': 0.0, 'count': 1})
+
+    matched = 0
+    for _ in range(10):
+        shift = rng.normal(size=2) * (MATCH_THRESHOLD_M / METERS_PER_DEGREE)
+        signature = route_signature(make_activity(0, base + shift))
+        origin = signature['points'][0]
+        query = _to_meters(signature['points'], origin)
+        valid = {
+            route_id for route_id, points in index._points.items()
+            if brute_frechet(query, _to_meters(points, origin)) <= MATCH_THRESHOLD_M
+        }
+        assert valid <= set(index._candidates(signature))
+        matched += len(valid)
+    assert 0 < matched < 10 * len(index._points)
+
+def test_route_index_groups_repeats_and_keeps_direction():
+    rng = np.random.default_rng(1)
+    base = loop(40.4, -3.7)
+    activities = [make_activity(i, base + rng.normal(size=base.shape) * (15 / METERS_PER_DEGREE),
+                                f'2024-01-{i:02d}T08:00:00Z') for i in range(1, 6)]
+    activities.append(make_activity(6, base[::-1], '2024-01-06T08:00:00Z'))
+    activities.append(make_activity(7, loop(40.5, -3.7), '2024-01-07T08:00:00Z'))
+    index = RouteIndex.from_activities(activities)
+
+    assert len({index.route_of(i) for i in range(1, 6)}) == 1
+    assert index.route_of(6) != index.route_of(1)
+    assert index.route_of(7) not in (index.route_of(1), index.route_of(6))
+    assert index.routes()[0] == {'id': index.route_of(1), 'leader': 1, 'distance': 5000.0, 'count': 5}
+    assert index.routes(min_count=2) == index.routes()[:1]
+
+def test_route_index_incremental_updates():
+    base = loop(40.4, -3.7)
+    other = loop(40.5, -3.7)
+    index = RouteIndex.from_activities([make_activity(1, base), make_activity(2, base)])
+    route = index.route_of(1)
+
+    assert not index.upsert(make_activity(2, base))
+    assert not index.upsert({'id': 3})
+    # Editar el recorrido mueve la actividad a otra ruta
+    assert index.upsert(make_activity(2, other))
+    assert index.route_of(2) != route
+    # Quitar la última actividad de una ruta la elimina
+    index.remove(1)
+    assert index.route_of(1) is None
+    assert route not in {r['id'] for r in index.routes()}
+    assert len(index) == 1
+
+    restored = RouteIndex.from_dict(index.to_dict())
+    assert restored.assignments() == index.assignments()
+    assert restored.upsert(make_activity(4, other))
+    assert restored.route_of(4) == restored.route_of(2)
+    # Los ids de ruta no se reutilizan
+    assert restored.upsert(make_activity(5, base))
+    assert restored.route_of(5) not in (route, restored.route_of(2))
@@ -0,0 +1,19 @@
+from strava_simulator import SimulatorState, create_app
+from synthetic_activities import generate_activities
+
+def test_stats_count_every_status():
+    state = SimulatorState(generate_activities(5), read_rate_limit=(3, 100))
+    client = create_app(state).test_client()
+    headers = {'Authorization': 'Bearer token'}
+
+    assert client.get('/api/v3/activities/1', headers=headers).status_code == 404
+    assert client.get('/api/v3/athlete/activities?page=x', headers=headers).status_code == 400
+    assert client.get('/api/v3/athlete/activities').status_code == 401
+    assert client.get('/api/v3/athlete/activities', headers=headers).status_code == 200
+    assert client.get('/api/v3/athlete/activities', headers=headers).status_code == 429
+    assert client.post('/oauth/token', data={'grant_type': 'password'}).status_code == 400
+
+    stats = client.get('/simulator/stats').get_json()['stats']
+    assert {key: value for key, value in stats.items() if key.startswith('status:')} == {
+        'status:200': 1, 'status:400': 2, 'status:401': 1, 'status:404': 1, 'status:429': 1
+    }
@@ -7,11 +7,20 @@ import json
 import os
 import time
 import logging
+from app_settings import APP_CONFIG
+from instrumentation import span, export_metrics, profile_run
+from records_index import RECORD_METRICS, load_records_index, update_records_index
+from deduplication import deduplicate, load_duplicates_index, update_duplicates_index
+from route_matching import load_route_index, update_route_index
+from rolling_analytics import DailyCumulative
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Copy-on-write: las selecciones derivadas del DataFrame compartido nunca lo modifican
+pd.set_option('mode.copy_on_write', True)
+
 try:
     from strava_data_extractor import actualizar_datos
     logger.info("Módulo strava_data_extractor importado correctamente")
@@ -39,11 +48,11 @@ def datos_desactualizados():
         logger.error(f"Error checking data age: {str(e)}")
         return True
 
-def load_data():
+def load_data(filename='strava_activities.json'):
     """Carga los datos desde el archivo JSON"""
     try:
         logger.info("Loading data from JSON...")
-        with open('strava_activities.json', 'r', encoding='utf-8') as f:
+        with open(filename, 'r', encoding='utf-8') as f:
             activities = json.load(f)
         return pd.DataFrame(activities)
     except Exception as e:
@@ -75,7 +84,182 @@ def prepare_data(df):
         st.error(f"Error preparando datos: {str(e)}")
         return df
 
+def data_version(filename='strava_activities.json'):
+    """
+    Versión de los datos: fechas de modificación del archivo JSON y de los índices
+    La sincronización guarda las actividades antes que los índices, así que si
+    la versión dependiera solo del JSON, una recarga en ese intervalo quedaría
+    cacheada con los índices antiguos hasta la siguiente sincronización.
+    """
+    version = []
+    for path in (filename, APP_CONFIG['duplicates_file'], APP_CONFIG['records_file'], APP_CONFIG['routes_file']):
+        try:
+            version.append(os.path.getmtime(path))
+        except OSError:
+            version.append(0)
+    return tuple(version)
+
+def load_duplicates(activities_file='strava_activities.json'):
+    """Devuelve {id duplicado: id conservado} según el índice mantenido en la sincronización"""
+    index = load_duplicates_index()
+    if index is None:
+        # Datos descargados antes de existir el índice: se construye una vez
+        logger.info("Duplicates index not found, building it...")
+        with open(activities_file, 'r', encoding='utf-8') as f:
+            index = update_duplicates_index(json.load(f))
+    return index.duplicates()
+
+def load_records(activities_file='strava_activities.json'):
+    """Carga el índice de récords mantenido en la sincronización"""
+    index = load_records_index()
+    if index is None:
+        # Datos descargados antes de existir el índice: se construye una vez
+        logger.info("Records index not found, building it...")
+        with open(activities_file, 'r', encoding='utf-8') as f:
+            index = update_records_index(deduplicate(json.load(f), load_duplicates_index()))
+    return index
+
+def load_routes(activities_file='strava_activities.json'):
+    """Carga el índice de rutas mantenido en la sincronización"""
+    index = load_route_index()
+    if index is None:
+        # Datos descargados antes de existir el índice: se construye una vez
+        logger.info("Route index not found, building it...")
+        with open(activities_file, 'r', encoding='utf-8') as f:
+            index = update_route_index(deduplicate(json.load(f), load_duplicates_index()))
+    return index
+
+class SharedDataset:
+    """
+    Datos preparados de una versión del archivo, compartidos por todas las sesiones
+    Es de solo lectura: las sesiones filtran sobre él pero nunca lo modifican,
+    y solo guardan en su estado las selecciones de los filtros.
+    """
+
+    def __init__(self, version, df, records=None, daily=None, duplicates=0, routes=None):
+        self.version = version
+        self.df = df
+        self.records = records
+        self.daily = daily
+        self.routes = routes
+        # Número de grabaciones duplicadas excluidas de df
+        self.duplicates = duplicates
+
+@st.cache_resource(max_entries=1, show_spinner="Cargando actividades...")
+def get_shared_dataset(version):
+    """
+    Carga y prepara los datos una sola vez por versión para todo el proceso
+    max_entries=1 libera la versión anterior en cuanto se publica una nueva.
+    """
+    with span('dataset_load_data'):
+        df = load_data()
+    if df.empty:
+        return SharedDataset(version, df)
+    with span('dataset_deduplicate'):
+        duplicates = load_duplicates()
+        if duplicates:
+            df = df[~df['id'].isin(list(duplicates))]
+    with span('dataset_prepare_data'):
+        df = prepare_data(df)
+    with span('dataset_records'):
+        records = load_records()
+    with span('dataset_daily_cumulative'):
+        daily = DailyCumulative(df)
+    with span('dataset_routes'):
+        routes = load_routes()
+        df['route_id'] = df['id'].map(routes.assignments())
+    logger.info(f"Shared dataset published: {len(df)} activities, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    return SharedDataset(version, df, records, daily, len(duplicates), routes)
+
+def select_by_ids(df, ids):
+    """Devuelve las filas de df cuyos ids están en la lista, en el mismo orden que la lista"""
+    rows = df[df['id'].isin(ids)]
+    order = {activity_id: position for position, activity_id in enumerate(ids)}
+    return rows.iloc[rows['id'].map(order).argsort()]
+
+def format_hours(hours):
+    """Convierte horas decimales a formato '0h 00m'"""
+    return f"{int(hours)}h {int((hours % 1) * 60):02d}m"
+
+# Repeticiones mínimas para mostrar una ruta en el progreso por ruta
+MIN_ROUTE_ACTIVITIES = 3
+
+# Métrica del índice -> (título, formato del valor en unidades de la API)
+RECORD_LABELS = {
+    'distance': ('Distancia', lambda v: f"{v / 1000:.1f} km"),
+    'total_elevation_gain': ('Desnivel', lambda v: f"{v:.0f} m"),
+    'moving_time': ('Tiempo en Movimiento', lambda v: format_hours(v / 3600)),
+    'average_speed': ('Velocidad Media', lambda v: f"{v * 3.6:.1f} km/h"),
+}
+
+# Ventanas móviles (días) y métricas: columna -> (título, unidad)
+ROLLING_WINDOWS = [7, 28, 90, 365]
+ROLLING_METRICS = {
+    'distance_km': ('Distancia', 'km'),
+    'moving_time_hours': ('Tiempo', 'h'),
+    'total_elevation_gain': ('Elevación', 'm'),
+}
+
+def compute_monthly_counts(filtered_df):
+    """Número de actividades por mes"""
+    monthly_activities = filtered_df.groupby(['year', 'month']).size().reset_index(name='count')
+    monthly_activities['date'] = pd.to_datetime(monthly_activities[['year', 'month']].assign(day=1))
+    return monthly_activities
+
+def compute_weekly_counts(filtered_df):
+    """Número de actividades por semana"""
+    weekly_activities = filtered_df.groupby('week_date').size().reset_index(name='count')
+    weekly_activities.columns = ['date', 'count']
+    return weekly_activities
+
+def compute_stats_by_type(filtered_df):
+    """Estadísticas agregadas por tipo de actividad"""
+    stats_by_type = filtered_df.groupby('type').agg({
+        'distance_km': ['count', 'sum', 'mean'],
+        'moving_time_hours': ['sum', 'mean'],
+        'total_elevation_gain': ['sum', 'mean']
+    }).round(2)
+    
+    stats_by_type.columns = [
+        'Número de Actividades',
+        'Distancia Total (km)',
+        'Distancia Media (km)',
+        'Tiempo Total (h)',
+        'Tiempo Medio (h)',
+        'Elevación Total (m)',
+        'Elevación Media (m)'
+    ]
+    return stats_by_type
+
+def compute_yearly_stats(filtered_df):
+    """Totales anuales por tipo de actividad"""
+    return filtered_df.groupby(['year', 'type']).agg({
+        'distance_km': 'sum',
+        'moving_time_hours': 'sum',
+        'total_elevation_gain': 'sum'
+    }).reset_index()
+
+def compute_monthly_stats(filtered_df):
+    """Totales mensuales por tipo de actividad"""
+    monthly_stats = filtered_df.groupby(['year', 'month', 'type']).agg({
+        'distance_km': 'sum',
+        'moving_time_hours': 'sum',
+        'total_elevation_gain': 'sum'
+    }).reset_index()
+    
+    # Crear fecha para el eje X
+    monthly_stats['date'] = pd.to_datetime(monthly_stats[['year', 'month']].assign(day=1))
+    return monthly_stats
+
 def main():
+    with profile_run('dashboard'):
+        try:
+            with span('dashboard_render'):
+                _render_dashboard()
+        finally:
+            export_metrics()
+
+def _render_dashboard():
     try:
         logger.info("Starting application...")
         st.set_page_config(page_title="Análisis de Actividades Strava", layout="wide")
@@ -120,9 +304,12 @@ def main():
         st.sidebar.header("Filtros")
         
         # Cargar y preparar datos
-        df = load_data()
+        with span('dashboard_load_data'):
+            dataset = get_shared_dataset(data_version())
+        df = dataset.df
+        if dataset.duplicates:
+            st.sidebar.caption(f"{dataset.duplicates} grabaciones duplicadas excluidas de los totales")
         if not df.empty:
-            df = prepare_data(df)
             
             # Filtro por año
             years = sorted(df['year'].unique(), reverse=True)
@@ -159,234 +346,350 @@ def main():
             mask = (df['year'].isin(selected_years)) & (df['type'].isin(selected_types))
             if selected_month_numbers:
                 mask = mask & (df['month'].isin(selected_month_numbers))
-            filtered_df = df[mask]
+            # Sin filtros efectivos se usa el DataFrame compartido sin copiarlo
+            filtered_df = df if mask.all() else df[mask]
+            records = dataset.records
             
-            # Resumen general
-            st.header("Resumen General")
-            col1, col2, col3, col4 = st.columns(4)
+            with span('dashboard_summary'):
+                # Resumen general
+                st.header("Resumen General")
+                col1, col2, col3, col4 = st.columns(4)
             
-            with col1:
-                st.metric("Total Actividades", len(filtered_df))
-            with col2:
-                st.metric("Distancia Total", f"{filtered_df['distance_km'].sum():.1f} km")
-            with col3:
-                st.metric("Tiempo Total", f"{filtered_df['moving_time_hours'].sum():.1f} h")
-            with col4:
-                st.metric("Elevación Total", f"{filtered_df['total_elevation_gain'].sum():.0f} m")
+                with col1:
+                    st.metric("Total Actividades", len(filtered_df))
+                with col2:
+                    st.metric("Distancia Total", f"{filtered_df['distance_km'].sum():.1f} km")
+                with col3:
+                    st.metric("Tiempo Total", f"{filtered_df['moving_time_hours'].sum():.1f} h")
+                with col4:
+                    st.metric("Elevación Total", f"{filtered_df['total_elevation_gain'].sum():.0f} m")
             
-            # Gráficos
-            st.header("Evolución Temporal")
+            with span('dashboard_time_evolution'):
+                # Gráficos
+                st.header("Evolución Temporal")
             
-            # Selector de granularidad temporal
-            time_granularity = st.radio(
-                "Seleccionar granularidad temporal",
-                ["Mensual", "Semanal"],
-                horizontal=True
-            )
+                # Selector de granularidad temporal
+                time_granularity = st.radio(
+                    "Seleccionar granularidad temporal",
+                    ["Mensual", "Semanal"],
+                    horizontal=True
+                )
             
-            if time_granularity == "Mensual":
-                # Gráfico de actividades por mes
-                monthly_activities = filtered_df.groupby(['year', 'month']).size().reset_index(name='count')
-                monthly_activities['date'] = pd.to_datetime(monthly_activities[['year', 'month']].assign(day=1))
+                if time_granularity == "Mensual":
+                    # Gráfico de actividades por mes
+                    monthly_activities = compute_monthly_counts(filtered_df)
                 
-                fig_monthly = px.line(
-                    monthly_activities,
-                    x='date',
-                    y='count',
-                    title='Número de Actividades por Mes'
+                    fig_monthly = px.line(
+                        monthly_activities,
+                        x='date',
+                        y='count',
+                        title='Número de Actividades por Mes'
+                    )
+                    st.plotly_chart(fig_monthly, use_container_width=True)
+                else:
+                    # Gráfico de actividades por semana
+                    weekly_activities = compute_weekly_counts(filtered_df)
+                
+                    fig_weekly = px.line(
+                        weekly_activities,
+                        x='date',
+                        y='count',
+                        title='Número de Actividades por Semana'
+                    )
+                    st.plotly_chart(fig_weekly, use_container_width=True)
+            
+            with span('dashboard_rolling'):
+                # Totales en ventanas móviles desde las sumas acumuladas diarias
+                st.subheader("Ventanas Móviles")
+                daily = dataset.daily
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    window = st.selectbox(
+                        "Ventana",
+                        ROLLING_WINDOWS,
+                        index=1,
+                        format_func=lambda days: f"{days} días"
+                    )
+                with col2:
+                    rolling_metric = st.selectbox(
+                        "Métrica",
+                        list(ROLLING_METRICS.keys()),
+                        format_func=lambda metric: ROLLING_METRICS[metric][0]
+                    )
+                metric_label, metric_unit = ROLLING_METRICS[rolling_metric]
+                
+                # Totales de cada ventana hasta hoy
+                columns = st.columns(len(ROLLING_WINDOWS))
+                for column, days in zip(columns, ROLLING_WINDOWS):
+                    with column:
+                        total = daily.window_total(daily.end_date, days, rolling_metric, selected_types)
+                        st.metric(f"Últimos {days} días", f"{total:.1f} {metric_unit}")
+                
+                rolling = daily.rolling(window, rolling_metric, selected_types)
+                rolling = rolling[rolling.index.year.isin(selected_years)]
+                fig_rolling = px.line(
+                    x=rolling.index,
+                    y=rolling.values,
+                    title=f"{metric_label} en los Últimos {window} Días"
                 )
-                st.plotly_chart(fig_monthly, use_container_width=True)
-            else:
-                # Gráfico de actividades por semana
-                weekly_activities = filtered_df.groupby('week_date').size().reset_index(name='count')
-                weekly_activities.columns = ['date', 'count']
+                fig_rolling.update_layout(xaxis_title="Fecha", yaxis_title=f"{metric_label} ({metric_unit})")
+                st.plotly_chart(fig_rolling, use_container_width=True)
                 
-                fig_weekly = px.line(
-                    weekly_activities,
-                    x='date',
-                    y='count',
-                    title='Número de Actividades por Semana'
+                # Progreso acumulado de cada año, comparado por día del año
+                yearly_progress = daily.year_over_year(rolling_metric, selected_years, selected_types)
+                yearly_progress = yearly_progress.reset_index().melt(
+                    id_vars='day_of_year', var_name='year', value_name='total'
+                ).dropna()
+                fig_progress = px.line(
+                    yearly_progress,
+                    x='day_of_year',
+                    y='total',
+                    color='year',
+                    title=f"Progreso Acumulado Año a Año: {metric_label}"
                 )
-                st.plotly_chart(fig_weekly, use_container_width=True)
+                fig_progress.update_layout(xaxis_title="Día del año", yaxis_title=f"{metric_label} ({metric_unit})")
+                st.plotly_chart(fig_progress, use_container_width=True)
             
-            # Gráfico de distancia por tipo de actividad
-            st.header("Distribución por Tipo de Actividad")
-            col1, col2 = st.columns(2)
+            with span('dashboard_type_distribution'):
+                # Gráfico de distancia por tipo de actividad
+                st.header("Distribución por Tipo de Actividad")
+                col1, col2 = st.columns(2)
             
-            with col1:
-                fig_distance = px.pie(
-                    filtered_df,
-                    values='distance_km',
-                    names='type',
-                    title='Distancia por Tipo de Actividad'
-                )
-                st.plotly_chart(fig_distance, use_container_width=True)
-            
-            with col2:
-                fig_time = px.pie(
-                    filtered_df,
-                    values='moving_time_hours',
-                    names='type',
-                    title='Tiempo por Tipo de Actividad'
-                )
-                st.plotly_chart(fig_time, use_container_width=True)
+                with col1:
+                    fig_distance = px.pie(
+                        filtered_df,
+                        values='distance_km',
+                        names='type',
+                        title='Distancia por Tipo de Actividad'
+                    )
+                    st.plotly_chart(fig_distance, use_container_width=True)
             
-            # Estadísticas por tipo de actividad
-            st.header("Estadísticas por Tipo de Actividad")
-            stats_by_type = filtered_df.groupby('type').agg({
-                'distance_km': ['count', 'sum', 'mean'],
-                'moving_time_hours': ['sum', 'mean'],
-                'total_elevation_gain': ['sum', 'mean']
-            }).round(2)
+                with col2:
+                    fig_time = px.pie(
+                        filtered_df,
+                        values='moving_time_hours',
+                        names='type',
+                        title='Tiempo por Tipo de Actividad'
+                    )
+                    st.plotly_chart(fig_time, use_container_width=True)
             
-            stats_by_type.columns = [
-                'Número de Actividades',
-                'Distancia Total (km)',
-                'Distancia Media (km)',
-                'Tiempo Total (h)',
-                'Tiempo Medio (h)',
-                'Elevación Total (m)',
-                'Elevación Media (m)'
-            ]
+            with span('dashboard_stats_by_type'):
+                # Estadísticas por tipo de actividad
+                st.header("Estadísticas por Tipo de Actividad")
+                stats_by_type = compute_stats_by_type(filtered_df)
             
-            st.dataframe(stats_by_type)
+                st.dataframe(stats_by_type)
             
-            # Evolución anual
-            st.header("Evolución Anual")
-            yearly_stats = filtered_df.groupby(['year', 'type']).agg({
-                'distance_km': 'sum',
-                'moving_time_hours': 'sum',
-                'total_elevation_gain': 'sum'
-            }).reset_index()
+            with span('dashboard_yearly_evolution'):
+                # Evolución anual
+                st.header("Evolución Anual")
+                yearly_stats = compute_yearly_stats(filtered_df)
             
-            fig_yearly_distance = px.bar(
-                yearly_stats,
-                x='year',
-                y='distance_km',
-                color='type',
-                title='Distancia Anual por Tipo de Actividad',
-                barmode='group'
-            )
-            st.plotly_chart(fig_yearly_distance, use_container_width=True)
-
-            # Gráfico de tiempo anual por tipo de actividad
-            fig_yearly_time = px.bar(
-                yearly_stats,
-                x='year',
-                y='moving_time_hours',
-                color='type',
-                title='Tiempo Anual por Tipo de Actividad',
-                barmode='group'
-            )
-            st.plotly_chart(fig_yearly_time, use_container_width=True)
+                fig_yearly_distance = px.bar(
+                    yearly_stats,
+                    x='year',
+                    y='distance_km',
+                    color='type',
+                    title='Distancia Anual por Tipo de Actividad',
+                    barmode='group'
+                )
+                st.plotly_chart(fig_yearly_distance, use_container_width=True)
 
-            # Evolución mensual
-            st.header("Evolución Mensual")
-            
-            # Preparar datos mensuales
-            monthly_stats = filtered_df.groupby(['year', 'month', 'type']).agg({
-                'distance_km': 'sum',
-                'moving_time_hours': 'sum',
-                'total_elevation_gain': 'sum'
-            }).reset_index()
+                # Gráfico de tiempo anual por tipo de actividad
+                fig_yearly_time = px.bar(
+                    yearly_stats,
+                    x='year',
+                    y='moving_time_hours',
+                    color='type',
+                    title='Tiempo Anual por Tipo de Actividad',
+                    barmode='group'
+                )
+                st.plotly_chart(fig_yearly_time, use_container_width=True)
+
+            with span('dashboard_monthly_evolution'):
+                # Evolución mensual
+                st.header("Evolución Mensual")
             
-            # Crear fecha para el eje X
-            monthly_stats['date'] = pd.to_datetime(monthly_stats[['year', 'month']].assign(day=1))
+                # Preparar datos mensuales
+                monthly_stats = compute_monthly_stats(filtered_df)
             
-            # Gráfico de distancia mensual
-            fig_monthly_distance = px.line(
-                monthly_stats,
-                x='date',
-                y='distance_km',
-                color='type',
-                title='Distancia Mensual por Tipo de Actividad',
-                markers=True
-            )
-            fig_monthly_distance.update_layout(
-                xaxis_title="Mes",
-                yaxis_title="Distancia (km)"
-            )
-            st.plotly_chart(fig_monthly_distance, use_container_width=True)
+                # Gráfico de distancia mensual
+                fig_monthly_distance = px.line(
+                    monthly_stats,
+                    x='date',
+                    y='distance_km',
+                    color='type',
+                    title='Distancia Mensual por Tipo de Actividad',
+                    markers=True
+                )
+                fig_monthly_distance.update_layout(
+                    xaxis_title="Mes",
+                    yaxis_title="Distancia (km)"
+                )
+                st.plotly_chart(fig_monthly_distance, use_container_width=True)
             
-            # Gráfico de tiempo mensual
-            fig_monthly_time = px.line(
-                monthly_stats,
-                x='date',
-                y='moving_time_hours',
-                color='type',
-                title='Tiempo Mensual por Tipo de Actividad',
-                markers=True
-            )
-            fig_monthly_time.update_layout(
-                xaxis_title="Mes",
-                yaxis_title="Tiempo (horas)"
-            )
-            st.plotly_chart(fig_monthly_time, use_container_width=True)
+                # Gráfico de tiempo mensual
+                fig_monthly_time = px.line(
+                    monthly_stats,
+                    x='date',
+                    y='moving_time_hours',
+                    color='type',
+                    title='Tiempo Mensual por Tipo de Actividad',
+                    markers=True
+                )
+                fig_monthly_time.update_layout(
+                    xaxis_title="Mes",
+                    yaxis_title="Tiempo (horas)"
+                )
+                st.plotly_chart(fig_monthly_time, use_container_width=True)
             
-            # Gráfico de elevación mensual
-            fig_monthly_elevation = px.line(
-                monthly_stats,
-                x='date',
-                y='total_elevation_gain',
-                color='type',
-                title='Elevación Mensual por Tipo de Actividad',
-                markers=True
-            )
-            fig_monthly_elevation.update_layout(
-                xaxis_title="Mes",
-                yaxis_title="Elevación (m)"
-            )
-            st.plotly_chart(fig_monthly_elevation, use_container_width=True)
+                # Gráfico de elevación mensual
+                fig_monthly_elevation = px.line(
+                    monthly_stats,
+                    x='date',
+                    y='total_elevation_gain',
+                    color='type',
+                    title='Elevación Mensual por Tipo de Actividad',
+                    markers=True
+                )
+                fig_monthly_elevation.update_layout(
+                    xaxis_title="Mes",
+                    yaxis_title="Elevación (m)"
+                )
+                st.plotly_chart(fig_monthly_elevation, use_container_width=True)
 
-            # Actividades de ciclismo largas
-            st.header("🚴 Actividades de Ciclismo Largas (>100km)")
+            with span('dashboard_long_rides'):
+                # Actividades de ciclismo largas
+                st.header("🚴 Actividades de Ciclismo Largas (>100km)")
             
-            # Filtrar actividades de ciclismo largas
-            long_rides = filtered_df[
-                (filtered_df['type'] == 'Ride') & 
-                (filtered_df['distance_km'] >= 100)
-            ].sort_values('distance_km', ascending=False)
+                # Actividades de ciclismo largas, ya ordenadas, desde el índice de récords
+                long_ride_ids = []
+                if 'Ride' in selected_types:
+                    long_ride_ids = [
+                        activity_id for activity_id, _ in
+                        records.at_least('distance', 'Ride', 100000, years=selected_years)
+                    ]
+                long_rides = select_by_ids(filtered_df, long_ride_ids)
             
-            if len(long_rides) > 0:
-                # Mostrar métricas principales
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Número de Rutas Largas", len(long_rides))
-                with col2:
-                    st.metric("Distancia Total", f"{long_rides['distance_km'].sum():.1f} km")
-                with col3:
-                    st.metric("Elevación Total", f"{long_rides['total_elevation_gain'].sum():.0f} m")
+                if len(long_rides) > 0:
+                    # Mostrar métricas principales
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Número de Rutas Largas", len(long_rides))
+                    with col2:
+                        st.metric("Distancia Total", f"{long_rides['distance_km'].sum():.1f} km")
+                    with col3:
+                        st.metric("Elevación Total", f"{long_rides['total_elevation_gain'].sum():.0f} m")
                 
-                # Preparar datos para la tabla
-                rides_display = long_rides[[
-                    'start_date_local', 'name', 'distance_km', 
-                    'moving_time_hours', 'total_elevation_gain',
-                    'average_heartrate', 'max_heartrate'
-                ]].copy()
+                    # Preparar datos para la tabla
+                    rides_display = long_rides[[
+                        'start_date_local', 'name', 'distance_km', 
+                        'moving_time_hours', 'total_elevation_gain',
+                        'average_heartrate', 'max_heartrate'
+                    ]].copy()
                 
-                # Formatear el tiempo
-                rides_display['moving_time_hours'] = rides_display['moving_time_hours'].apply(
-                    lambda x: f"{int(x)}h {int((x % 1) * 60):02d}m"
-                )
+                    # Formatear el tiempo
+                    rides_display['moving_time_hours'] = rides_display['moving_time_hours'].apply(format_hours)
                 
-                # Formatear la fecha
-                rides_display['start_date_local'] = rides_display['start_date_local'].dt.strftime('%d/%m/%Y')
+                    # Formatear la fecha
+                    rides_display['start_date_local'] = rides_display['start_date_local'].dt.strftime('%d/%m/%Y')
                 
-                # Renombrar columnas
-                rides_display.columns = [
-                    'Fecha', 'Nombre', 'Distancia (km)', 
-                    'Tiempo', 'Elevación (m)',
-                    'Pulsaciones Medias', 'Pulsaciones Máximas'
-                ]
+                    # Renombrar columnas
+                    rides_display.columns = [
+                        'Fecha', 'Nombre', 'Distancia (km)', 
+                        'Tiempo', 'Elevación (m)',
+                        'Pulsaciones Medias', 'Pulsaciones Máximas'
+                    ]
                 
-                # Mostrar tabla
-                st.dataframe(
-                    rides_display,
-                    use_container_width=True,
-                    hide_index=True
+                    # Mostrar tabla
+                    st.dataframe(
+                        rides_display,
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                else:
+                    st.info("No hay actividades de ciclismo de más de 100km en el período seleccionado.")
+
+            with span('dashboard_records'):
+                st.header("🏆 Récords Personales")
+                record_types = [t for t in records.types() if t in selected_types]
+                if record_types:
+                    record_type = st.selectbox("Tipo de actividad", record_types)
+                    
+                    # Con un filtro de meses parcial, solo cuentan las actividades visibles
+                    allowed_ids = None
+                    if selected_month_numbers and len(selected_month_numbers) < 12:
+                        allowed_ids = set(filtered_df['id'])
+                    
+                    columns = st.columns(len(RECORD_METRICS))
+                    for column, metric in zip(columns, RECORD_METRICS):
+                        title, format_value = RECORD_LABELS[metric]
+                        top = records.top(metric, record_type, years=selected_years, n=5, allowed_ids=allowed_ids)
+                        with column:
+                            st.subheader(title)
+                            if not top:
+                                st.caption("Sin datos")
+                                continue
+                            # El índice puede ir por delante del DataFrame compartido justo
+                            # después de una sincronización: solo se muestran las filas encontradas
+                            values = dict(top)
+                            top_rows = select_by_ids(df, [activity_id for activity_id, _ in top])
+                            st.dataframe(
+                                pd.DataFrame({
+                                    'Fecha': top_rows['start_date_local'].dt.strftime('%d/%m/%Y').values,
+                                    'Nombre': top_rows['name'].values,
+                                    title: [format_value(values[activity_id]) for activity_id in top_rows['id']]
+                                }),
+                                use_container_width=True,
+                                hide_index=True
+                            )
+                else:
+                    st.info("No hay récords para los tipos de actividad seleccionados.")
+
+            with span('dashboard_routes'):
+                st.header("🔁 Progreso por Ruta")
+                # Cada ruta se sigue por separado para cada tipo de actividad
+                route_stats = (
+                    filtered_df.dropna(subset=['route_id'])
+                    .groupby(['route_id', 'type'])
+                    .agg(count=('id', 'size'), distance_km=('distance_km', 'median'), name=('name', 'first'))
+                    .reset_index()
                 )
-            else:
-                st.info("No hay actividades de ciclismo de más de 100km en el período seleccionado.")
+                route_stats = route_stats[route_stats['count'] >= MIN_ROUTE_ACTIVITIES].sort_values('count', ascending=False)
+                if not route_stats.empty:
+                    route_labels = {
+                        f"{row.type}: {row.name} · {row.distance_km:.1f} km · {row.count} actividades "
+                        f"(ruta {int(row.route_id)})": (row.route_id, row.type)
+                        for row in route_stats.itertuples()
+                    }
+                    route_label = st.selectbox("Ruta", list(route_labels))
+                    route_id, route_type = route_labels[route_label]
+                    route_df = filtered_df[
+                        (filtered_df['route_id'] == route_id) & (filtered_df['type'] == route_type)
+                    ].sort_values('start_date_local')
+                    route_df = route_df.assign(speed_kmh=route_df['average_speed'] * 3.6)
+
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Mejor tiempo", format_hours(route_df['moving_time_hours'].min()))
+                    with col2:
+                        st.metric("Último tiempo", format_hours(route_df['moving_time_hours'].iloc[-1]))
+                    with col3:
+                        st.metric("Velocidad media", f"{route_df['speed_kmh'].mean():.1f} km/h")
+
+                    fig_route = px.line(
+                        route_df,
+                        x='start_date_local',
+                        y='speed_kmh',
+                        markers=True,
+                        hover_data=['name', 'distance_km'],
+                        title='Velocidad Media en Cada Repetición de la Ruta'
+                    )
+                    fig_route.update_layout(xaxis_title="Fecha", yaxis_title="Velocidad (km/h)")
+                    st.plotly_chart(fig_route, use_container_width=True)
+                else:
+                    st.info(f"No hay rutas repetidas al menos {MIN_ROUTE_ACTIVITIES} veces en el período seleccionado.")
         else:
             st.error("No hay datos disponibles. Por favor, actualiza los datos.")
     except Exception as e: